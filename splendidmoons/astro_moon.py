@@ -1,3 +1,4 @@
+from typing import Dict
 import datetime
 
 from splendidmoons.ical import HasIcalEvent
@@ -6,6 +7,12 @@ class AstroMoon(HasIcalEvent):
     date: datetime.date = datetime.date.fromtimestamp(0)
     phase: str = ""
 
+    def to_dict(self) -> Dict:
+        return {
+            "date": self.date.isoformat(),
+            "phase": self.phase,
+        }
+
     def __str__(self) -> str:
         if self.phase == "":
             return ""
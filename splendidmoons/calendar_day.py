@@ -1,11 +1,13 @@
 from math import floor, sin, pi
+from typing import List, Iterable, Optional, Self, Tuple, TypedDict
 import datetime
 
 from splendidmoons.calendar_consts import (BE_DIFF, CS_DIFF, CYCLE_DAILY, CYCLE_SOLAR, ERA_AVOMAN, ERA_MASAKEN,
                                            KAMMACUBALA_DAILY, ERA_DAYS, ERA_HORAKHUN, ERA_YEARS, ERA_UCCABALA,
                                            MONTH_LENGTH)
-from splendidmoons.calendar_year import CalendarYear
-from splendidmoons.helpers import degree_to_ral, normalize_degree, ral_to_degree
+from splendidmoons.calendar_year import SuriyaYearValues, suriya_year_values, suriya_year_values_float
+from splendidmoons.engine import CalendarEngine, default_engine
+from splendidmoons.helpers import date_to_horakhun, degree_to_ral, horakhun_to_date, normalize_degree, ral_to_degree
 
 SURIYA_DAY_VALUES_FMT = """Year: {}
 Day: {}
@@ -25,195 +27,369 @@ TrueMoon: {}
 # http://astronomy.stackexchange.com/questions/12052/from-mean-moon-to-true-moon-in-an-old-procedural-calendar
 # http://astronomy.stackexchange.com/questions/11753/how-to-interpret-this-old-degree-notation
 
-class CalendarDay:
-    year:         int # Common Era
-    be_year:      int # Buddhist Era, CE + 543
-    cs_year:      int # Chulasakkarat Era, CE - 638
-    day:          int # nth day in the Lunar Year
-    date:         datetime.date
-    horakhun:     int
-    kammacubala:  int
-    uccabala:     int
-    avoman:       int
-    masaken:      int
-    tithi:        int
-    mean_sun:     float # position in degrees
-    true_sun:     float
-    mean_moon:    float
-    true_moon:    float
-    raek:         float
+# math.sin() takes radians
+RADCONV = pi / 180
 
-    def __init__(self, ce_year: int, lunar_year_day: int):
+# The -40 arcmin is a geographical correction, see mean_moon()
+MOON_LONGITUDE_CORRECTION = ral_to_degree(0, 0, 40)
 
-        # === A. Find the relevant values for the astronomical New Year ===
+# (0; 13:20) = 13.33 degree is one raek, i.e. 360 deg / 27 mansions
+RAEK_DEGREE = ral_to_degree(0, 13, 20)
 
-        cal_year = CalendarYear(ce_year)
+def mean_sun(elapsed_days: int, year_kammacubala: int) -> float:
+    """
+    Position of the Mean Sun in degrees, elapsed_days after the astronomical
+    New Year.
+    """
 
-        self.year = ce_year
-        self.be_year = ce_year + BE_DIFF
-        self.cs_year = ce_year - CS_DIFF
-        self.day = lunar_year_day
+    # Sample values in the comments are for lunar_year_day = 103, Asalha 15
+    #
+    # Length of the months, Thai months ending on New Moon:
+    # Citta   Full + New = 15+14
+    # Vesakha Full + New = 15+15
+    # Jettha  Full + New = 15+14
+    # Asalha  Full       = 15
+    # ---------------------------
+    #                    = 103
 
-        # This is elapsed_days = self.horakhun - cal_year.horakhun, but the meaning is
-        # perhaps clearer as below.
-        elapsed_days = self.day - cal_year.tithi
+    # interval from 1 Caitra (aka Citta) to Asalha Full Moon, minus New Year day
+
+    a = float((elapsed_days * ERA_YEARS) + year_kammacubala)
+    # a = 64552
+
+    b = (a / ERA_DAYS) * 360
+    # b = 79.5282796100025
+
+    # The -3 arcmin is a geographical correction. Mentioned in "Interpolation..." and "Calendrical".
+
+    # (x; y : z) in Eade's notation means 30*60*x + 60*y + z in arcmins, so x and y are deg originally
+    x, y, z = degree_to_ral(b)
+    z -= 3
+
+    # Do convert the degree to Ral and back. If we only do b -= 3/60, we get
+    # slightly different results than in Eade's papers.
+
+    # MeanSun = 2; 19 : 28
+    # MeanSun = 79.4666
+    return ral_to_degree(x, y, z)
+
+def true_sun(mean_sun: float) -> float:
+    """Position of the True Sun in degrees."""
+
+    # The -80 degree is mentioned in Calendrical, sth to do with the Sun's Apogee?
+
+    a = abs(mean_sun - 80)
+
+    b = floor(134 * sin(a*RADCONV))
+    # b = floor(1.2473)
+    # b = 1
+
+    # Floor it to get degree only to 4th decimal place, to avoid results such as TrueSun: 79.48326666666667
+    # TrueSun = 2; 19 : 29
+    return floor(mean_sun*10000+(b*10000)/60) / 10000
+
+def mean_moon(true_sun: float, avoman: int, tithi: int) -> float:
+    """Position of the Mean Moon in degrees."""
+
+    # step 12.
+
+    # divide with 60 to covert value in degrees from minutes
+    a = (float(avoman) + floor(float(avoman)/25)) / 60
+    # 0; 4 : 17
+    # b = 4.3
+
+    # step 13.
+
+    # The -40 arcmin is a geographical correction. In "Interpolation...": The
+    # routine subtraction of 3 arcmins is a geographical longitude correction for
+    # the sun, as is the subtraction of 40 arcmins for the moon (sec. C13).
 
-        # Horakhun of the day
-        self.horakhun = cal_year.horakhun + elapsed_days
+    # Use ral_to_degree() instead of 40/60. ral_to_degree() gives only a four decimal
+    # place value, which produces results closer to Eade's papers.
 
-        # Kammacubala of the day
-        self.kammacubala = KAMMACUBALA_DAILY - (self.cs_year * ERA_DAYS + ERA_HORAKHUN) % ERA_YEARS  + elapsed_days * KAMMACUBALA_DAILY
+    # Mean Moon: 8; 11 : 7
+    # Mean Moon: 251.116666
+    return normalize_degree(true_sun + a + (float(tithi) * 12) - MOON_LONGITUDE_CORRECTION)
 
-        # Uccabala of the day
-        self.uccabala = (self.horakhun + ERA_UCCABALA) % 3232
+def true_moon(mean_moon: float, year_uccabala: int, elapsed_days: int) -> float:
+    """Position of the True Moon in degrees."""
 
-        # helper values
-        ai: int
-        bi: int
+    # step 14.
 
-        # Avoman of the day
-        ai = (self.horakhun * CYCLE_DAILY) + ERA_AVOMAN
-        self.avoman = ai % CYCLE_SOLAR
+    mean_uccabala: float
 
-        # Masaken of the day
-        bi = int(floor(float(ai) / CYCLE_SOLAR)) + ERA_MASAKEN + self.horakhun
-        self.masaken = int(floor(float(bi / MONTH_LENGTH)))
+    # all in one, see below for step-by-step
+    mean_uccabala = ((((float(year_uccabala + elapsed_days) * 3 * 30) / 808) * 60) + 2) / 60
+    # Mean Uccabala = 6; 27 : 12
+    # Mean Uccabala = 207.2115
 
-        # Tithi of the day
-        self.tithi = bi % MONTH_LENGTH
+    """
+    Multiply with 30 to conform with (x; y : z) = 30*60*x + 60*y + z
 
-        # helper values
-        a: float
-        b: float
+    808 / 30 is 26.9333, perhaps reproducing the length of the lunar month.
 
-        # === B. Find the position of the Mean and true Sun on Asalha 15 ===
+    meanUccabala *= 30
 
-        # Sample values in the comments are for lunar_year_day = 103, Asalha 15
-        #
-        # Length of the months, Thai months ending on New Moon:
-        # Citta   Full + New = 15+14
-        # Vesakha Full + New = 15+15
-        # Jettha  Full + New = 15+14
-        # Asalha  Full       = 15
-        # ---------------------------
-        #                    = 103
+    Which gives Mean Uccabala = 6; 27 : 10
 
-        # interval from 1 Caitra (aka Citta) to Asalha Full Moon, minus New Year day
+    Convert to arcmin:
 
-        a = float((elapsed_days * ERA_YEARS) + cal_year.kammacubala)
-        # a = 64552
+    meanUccabala *= 60
 
-        b = (a / ERA_DAYS) * 360
-        # b = 79.5282796100025
+    Add 2, possibly correction for geographical position
 
-        # The -3 arcmin is a geographical correction. Mentioned in "Interpolation..." and "Calendrical".
+    meanUccabala += 2
 
-        # (x; y : z) in Eade's notation means 30*60*x + 60*y + z in arcmins, so x and y are deg originally
-        x, y, z = degree_to_ral(b)
-        z -= 3
+    Convert back to degree:
 
-        # Do convert the degree to Ral and back. If we only do b -= 3/60, we get
-        # slightly different results than in Eade's papers.
+    meanUccabala = meanUccabala / 60
 
-        self.mean_sun = ral_to_degree(x, y, z)
-        # MeanSun = 2; 19 : 28
-        # MeanSun = 79.4666
+    Mean Uccabala = 6; 27 : 12
+    """
 
-        # The -80 degree is mentioned in Calendrical, sth to do with the Sun's Apogee?
+    # step 15.
 
-        a = abs(self.mean_sun - 80)
+    a = mean_moon - mean_uccabala
+    # b = 1; 13 : 54
+    # b = 43.9051
 
-        # math.sin() takes radians
-        radconv = pi / 180
-        b = floor(134 * sin(a*radconv))
-        # b = floor(1.2473)
-        # b = 1
+    # NOTE: Eade has 1; 3 : 55, but that doesn't work. This is a typo in the paper.
 
-        # Floor it to get degree only to 4th decimal place, to avoid results such as TrueSun: 79.48326666666667
-        self.true_sun = floor(self.mean_sun*10000+(b*10000)/60) / 10000
-        # TrueSun = 2; 19 : 29
+    # step 16.
 
-        # === C. Find the Mean and True Moon on Asalha 15 ===
+    b = (296 * sin(a*RADCONV)) / 60
+    # d = 0; 3 : 24
+    # d = 3.4
 
-        # step 12.
+    # step 17.
 
-        # divide with 60 to covert value in degrees from minutes
-        a = (float(self.avoman) + floor(float(self.avoman)/25)) / 60
-        # 0; 4 : 17
-        # b = 4.3
+    # True Moon = 8; 7 : 43
+    # True Moon = 247.716666
+    return floor((mean_moon-b)*10000) / 10000
 
-        # step 13.
+def raek(true_moon: float) -> float:
+    """The lunar mansion of the True Moon, counted from 1."""
 
-        # The -40 arcmin is a geographical correction. In "Interpolation...": The
-        # routine subtraction of 3 arcmins is a geographical longitude correction for
-        # the sun, as is the subtraction of 40 arcmins for the moon (sec. C13).
+    # Raek aka Mula
+    # Raek = 0; 19 : 34
+    # Raek = 19.5771
+    return true_moon/RAEK_DEGREE + 1
 
-        # Use ral_to_degree() instead of 40/60. ral_to_degree() gives only a four decimal
-        # place value, which produces results closer to Eade's papers.
+SuriyaDayValues = SuriyaYearValues
 
-        self.mean_moon = normalize_degree(self.true_sun + a + (float(self.tithi) * 12) - ral_to_degree(0, 0, 40))
-        # Mean Moon: 8; 11 : 7
-        # Mean Moon: 251.116666
+def suriya_day_values(cs_year: int, year_horakhun: int, elapsed_days: int) -> SuriyaDayValues:
+    """
+    Horakhun, kammacubala, uccabala, avoman, masaken and tithi of the day
+    elapsed_days after the astronomical New Year, in exact integer arithmetic.
+    """
 
-        # step 14.
+    # Horakhun of the day
+    horakhun = year_horakhun + elapsed_days
 
-        mean_uccabala: float
+    # Kammacubala of the day
+    kammacubala = KAMMACUBALA_DAILY - (cs_year * ERA_DAYS + ERA_HORAKHUN) % ERA_YEARS  + elapsed_days * KAMMACUBALA_DAILY
 
-        # all in one, see below for step-by-step
-        mean_uccabala = ((((float(cal_year.uccabala + elapsed_days) * 3 * 30) / 808) * 60) + 2) / 60
-        # Mean Uccabala = 6; 27 : 12
-        # Mean Uccabala = 207.2115
+    # Uccabala of the day
+    uccabala = (horakhun + ERA_UCCABALA) % 3232
 
-        """
-        Multiply with 30 to conform with (x; y : z) = 30*60*x + 60*y + z
+    # Avoman of the day
+    ai = (horakhun * CYCLE_DAILY) + ERA_AVOMAN
+    avoman = ai % CYCLE_SOLAR
 
-        808 / 30 is 26.9333, perhaps reproducing the length of the lunar month.
+    # Masaken of the day
+    bi = ai // CYCLE_SOLAR + ERA_MASAKEN + horakhun
+    masaken = bi // MONTH_LENGTH
 
-        meanUccabala *= 30
+    # Tithi of the day
+    tithi = bi % MONTH_LENGTH
 
-        Which gives Mean Uccabala = 6; 27 : 10
+    return (horakhun, kammacubala, uccabala, avoman, masaken, tithi)
 
-        Convert to arcmin:
+def suriya_day_values_float(cs_year: int, year_horakhun: int, elapsed_days: int) -> SuriyaDayValues:
+    """The values of suriya_day_values(), with the float round-trips of the earlier implementation."""
 
-        meanUccabala *= 60
+    horakhun = year_horakhun + elapsed_days
+    kammacubala = KAMMACUBALA_DAILY - (cs_year * ERA_DAYS + ERA_HORAKHUN) % ERA_YEARS  + elapsed_days * KAMMACUBALA_DAILY
+    uccabala = (horakhun + ERA_UCCABALA) % 3232
 
-        Add 2, possibly correction for geographical position
+    ai = (horakhun * CYCLE_DAILY) + ERA_AVOMAN
+    avoman = ai % CYCLE_SOLAR
 
-        meanUccabala += 2
+    bi = int(floor(float(ai) / CYCLE_SOLAR)) + ERA_MASAKEN + horakhun
+    masaken = int(floor(float(bi / MONTH_LENGTH)))
 
-        Convert back to degree:
+    tithi = bi % MONTH_LENGTH
 
-        meanUccabala = meanUccabala / 60
+    return (horakhun, kammacubala, uccabala, avoman, masaken, tithi)
 
-        Mean Uccabala = 6; 27 : 12
-        """
+def horakhun_to_lunar_year_day(horakhun: int) -> Tuple[int, int]:
+    """
+    The CE year and the lunar year day of a horakhun, i.e. the arguments of
+    CalendarDay for that day.
+    """
 
-        # step 15.
+    ce_year = horakhun_to_date(horakhun).year
 
-        a = self.mean_moon - mean_uccabala
-        # b = 1; 13 : 54
-        # b = 43.9051
+    # Day 0 of the lunar year is the New Year horakhun minus its tithi. Dates
+    # before it in the solar year belong to the previous CE year's lunar year.
+    (year_horakhun, _, _, _, _, tithi) = suriya_year_values(ce_year - CS_DIFF)
+    day = horakhun - (year_horakhun - tithi)
 
-        # NOTE: Eade has 1; 3 : 55, but that doesn't work. This is a typo in the paper.
+    if day < 0:
+        ce_year -= 1
+        (year_horakhun, _, _, _, _, tithi) = suriya_year_values(ce_year - CS_DIFF)
+        day = horakhun - (year_horakhun - tithi)
 
-        # step 16.
+    return (ce_year, day)
 
-        b = (296 * sin(a*radconv)) / 60
-        # d = 0; 3 : 24
-        # d = 3.4
+SURIYA_VALUE_LABELS = ["horakhun", "kammacubala", "uccabala", "avoman", "masaken", "tithi"]
 
-        # step 17.
+class ArithmeticMismatch(TypedDict):
+    year: int
+    day: int # -1 for the year values
+    name: str
+    exact: int
+    legacy: int
 
-        self.true_moon = floor((self.mean_moon-b)*10000) / 10000
-        # True Moon = 8; 7 : 43
-        # True Moon = 247.716666
+def verify_suriya_arithmetic(from_year: int,
+                             to_year: int,
+                             days: Iterable[int] = range(0, 385),
+                             ) -> List[ArithmeticMismatch]:
+    """
+    Cross-check the integer calculation of the year and day values against the
+    earlier float calculation, for the years from_year to to_year (inclusive)
+    and the given lunar year days. Returns the values which differ.
+    """
+
+    mismatches: List[ArithmeticMismatch] = []
+    days = list(days)
+
+    def _compare(year: int, day: int, exact: SuriyaYearValues, legacy: SuriyaYearValues):
+        for name, a, b in zip(SURIYA_VALUE_LABELS, exact, legacy):
+            if a != b:
+                mismatches.append(ArithmeticMismatch(year = year, day = day, name = name, exact = a, legacy = b))
+
+    for year in range(from_year, to_year + 1):
+        cs_year = year - CS_DIFF
+        exact = suriya_year_values(cs_year)
+        _compare(year, -1, exact, suriya_year_values_float(cs_year))
+
+        year_horakhun, tithi = exact[0], exact[5]
+        for day in days:
+            elapsed_days = day - tithi
+            _compare(year, day,
+                     suriya_day_values(cs_year, year_horakhun, elapsed_days),
+                     suriya_day_values_float(cs_year, year_horakhun, elapsed_days))
+
+    return mismatches
+
+class CalendarDay:
+    year:         int # Common Era
+    be_year:      int # Buddhist Era, CE + 543
+    cs_year:      int # Chulasakkarat Era, CE - 638
+    day:          int # nth day in the Lunar Year
+    date:         datetime.date
+    horakhun:     int
+    kammacubala:  int
+    uccabala:     int
+    avoman:       int
+    masaken:      int
+    tithi:        int
+
+    # The positions of the sun and the moon (in degrees) and the raek are
+    # calculated on first access, see the properties below.
+
+    __slots__ = ("year", "be_year", "cs_year", "day", "date", "horakhun", "kammacubala", "uccabala", "avoman",
+                 "masaken", "tithi", "_elapsed_days", "_year_kammacubala", "_year_uccabala",
+                 "_mean_sun", "_true_sun", "_mean_moon", "_true_moon", "_raek")
+
+    _elapsed_days:     int
+    _year_kammacubala: int
+    _year_uccabala:    int
+    _mean_sun:         Optional[float]
+    _true_sun:         Optional[float]
+    _mean_moon:        Optional[float]
+    _true_moon:        Optional[float]
+    _raek:             Optional[float]
+
+    def __init__(self, ce_year: int, lunar_year_day: int, engine: Optional[CalendarEngine] = None):
+
+        # === A. Find the relevant values for the astronomical New Year ===
+
+        if engine is None:
+            engine = default_engine()
+
+        cal_year = engine.calendar_year(ce_year)
+
+        self.year = ce_year
+        self.be_year = ce_year + BE_DIFF
+        self.cs_year = ce_year - CS_DIFF
+        self.day = lunar_year_day
+
+        # This is elapsed_days = self.horakhun - cal_year.horakhun, but the meaning is
+        # perhaps clearer as below.
+        elapsed_days = self.day - cal_year.tithi
 
-        # (0; 13:20) = 13.33 degree is one raek, i.e. 360 deg / 27 mansions
-        a = ral_to_degree(0, 13, 20)
-        # Raek aka Mula
-        self.raek = self.true_moon/a + 1
-        # Raek = 0; 19 : 34
-        # Raek = 19.5771
+        (self.horakhun,
+         self.kammacubala,
+         self.uccabala,
+         self.avoman,
+         self.masaken,
+         self.tithi) = suriya_day_values(self.cs_year, cal_year.horakhun, elapsed_days)
+
+        # Kept for calculating the positions when they are first accessed.
+        self._elapsed_days = elapsed_days
+        self._year_kammacubala = cal_year.kammacubala
+        self._year_uccabala = cal_year.uccabala
+
+        self._mean_sun = None
+        self._true_sun = None
+        self._mean_moon = None
+        self._true_moon = None
+        self._raek = None
+
+    # === B. Find the position of the Mean and true Sun on Asalha 15 ===
+
+    @property
+    def mean_sun(self) -> float:
+        if self._mean_sun is None:
+            self._mean_sun = mean_sun(self._elapsed_days, self._year_kammacubala)
+        return self._mean_sun
+
+    @property
+    def true_sun(self) -> float:
+        if self._true_sun is None:
+            self._true_sun = true_sun(self.mean_sun)
+        return self._true_sun
+
+    # === C. Find the Mean and True Moon on Asalha 15 ===
+
+    @property
+    def mean_moon(self) -> float:
+        if self._mean_moon is None:
+            self._mean_moon = mean_moon(self.true_sun, self.avoman, self.tithi)
+        return self._mean_moon
+
+    @property
+    def true_moon(self) -> float:
+        if self._true_moon is None:
+            self._true_moon = true_moon(self.mean_moon, self._year_uccabala, self._elapsed_days)
+        return self._true_moon
+
+    @property
+    def raek(self) -> float:
+        if self._raek is None:
+            self._raek = raek(self.true_moon)
+        return self._raek
+
+    @classmethod
+    def from_horakhun(cls, horakhun: int, engine: Optional[CalendarEngine] = None) -> Self:
+        ce_year, day = horakhun_to_lunar_year_day(horakhun)
+        return cls(ce_year, day, engine)
+
+    @classmethod
+    def from_date(cls, date: datetime.date, engine: Optional[CalendarEngine] = None) -> Self:
+        return cls.from_horakhun(date_to_horakhun(date), engine)
 
     def suriya_values_str(self) -> str:
         return SURIYA_DAY_VALUES_FMT.format(self.year, self.day, self.be_year, self.cs_year, self.masaken,
@@ -1,9 +1,16 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from enum import Enum
 from math import floor
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple, TypedDict
 import datetime
-from splendidmoons import ADHIKAVARA_HISTORICAL_EXCEPTIONS, USE_HISTORICAL_EXCEPTIONS
+import threading
 
 from splendidmoons.calendar_consts import (BE_DIFF, CS_DIFF, CYCLE_DAILY, CYCLE_SOLAR, ERA_AVOMAN, ERA_DAYS, ERA_HORAKHUN, ERA_MASAKEN, ERA_UCCABALA, KAMMACUBALA_DAILY, MONTH_LENGTH)
+from splendidmoons.year_table import YearTable
+
+if TYPE_CHECKING:
+    from splendidmoons.engine import CalendarEngine
 
 class YearType(int, Enum):
     Normal = 0
@@ -16,6 +23,20 @@ YEAR_TYPE_NAME = {
     YearType.Adhikavara: "Adhikavāra",
 }
 
+# Length of the lunar year in days, see CalendarYear.year_length()
+YEAR_LENGTH_DAYS = {
+    YearType.Normal: 6 * (30 + 29),
+    YearType.Adhikamasa: 6 * (30 + 29) + 30,
+    YearType.Adhikavara: 6 * (30 + 29) + 1,
+}
+
+# Days from the previous Kattika to Asalha Puja, see CalendarYear.asalha_puja()
+ASALHA_PUJA_DAYS = {
+    YearType.Normal: 4 * (29 + 30),
+    YearType.Adhikamasa: 4 * (29 + 30) + 30,
+    YearType.Adhikavara: 4 * (29 + 30) + 1,
+}
+
 SURIYA_YEAR_VALUES_FMT = """CE: {}
 BE: {}
 CS: {}
@@ -27,6 +48,120 @@ Masaken: {}
 Tithi: {}
 """
 
+# Number of CalendarYear objects kept in a YearCache. A multi-decade export
+# touches the years of the range and their neighbours, plus the years stepped
+# over when locating the previous Kattika.
+YEAR_CACHE_MAXSIZE = 512
+
+# A known Kattika full moon, the epoch of the KattikaTable.
+KATTIKA_EPOCH_DATE_TUPLE = (2015, 11, 25)
+
+# Number of years the KattikaTable grows past the requested year when it has
+# to be extended, so that stepping through a range extends it only occasionally.
+KATTIKA_TABLE_CHUNK = 64
+
+# Number of years classified at a time when the LeapYearIndex has to grow.
+LEAP_YEAR_INDEX_CHUNK = 64
+
+def _default_engine() -> "CalendarEngine":
+    # Imported here, the engine module imports this one.
+    from splendidmoons.engine import default_engine
+    return default_engine()
+
+SuriyaYearValues = Tuple[int, int, int, int, int, int]
+
+def suriya_year_values(cs_year: int) -> SuriyaYearValues:
+    """
+    Horakhun, kammacubala, uccabala, avoman, masaken and tithi for the
+    astronomical New Year of a CS year.
+
+    Only integer floor division and modulo are used, which is exact for any
+    year. See suriya_year_values_float() for the earlier float calculation.
+    """
+
+    # === A. Find the relevant values for the astronomical New Year ===
+
+    # +1 is another constant correction, H3
+    a = (cs_year * ERA_DAYS) + ERA_HORAKHUN
+    horakhun = a // KAMMACUBALA_DAILY + 1
+
+    kammacubala = KAMMACUBALA_DAILY - (a % KAMMACUBALA_DAILY)
+
+    uccabala = (horakhun + ERA_UCCABALA) % 3232
+
+    a = (horakhun * CYCLE_DAILY) + ERA_AVOMAN
+    avoman = a % CYCLE_SOLAR
+
+    b = a // CYCLE_SOLAR
+    masaken = (b + ERA_MASAKEN + horakhun) // MONTH_LENGTH
+
+    tithi = (b + horakhun) % MONTH_LENGTH
+
+    return (horakhun, kammacubala, uccabala, avoman, masaken, tithi)
+
+def suriya_year_values_float(cs_year: int) -> SuriyaYearValues:
+    """
+    The same values as suriya_year_values(), calculated with the float
+    round-trips of the earlier implementation. Only used to cross-check the
+    integer calculation, see calendar_day.verify_suriya_arithmetic().
+    """
+
+    a = (cs_year * ERA_DAYS) + ERA_HORAKHUN
+    horakhun = int(floor(float(a/KAMMACUBALA_DAILY + 1)))
+
+    kammacubala = KAMMACUBALA_DAILY - (a % KAMMACUBALA_DAILY)
+
+    uccabala = (horakhun + ERA_UCCABALA) % 3232
+
+    a = (horakhun * CYCLE_DAILY) + ERA_AVOMAN
+    avoman = a % CYCLE_SOLAR
+
+    b = int(floor(float(a) / CYCLE_SOLAR))
+    masaken = int(floor(float((b + ERA_MASAKEN + horakhun) / MONTH_LENGTH)))
+
+    tithi = (b + horakhun) % MONTH_LENGTH
+
+    return (horakhun, kammacubala, uccabala, avoman, masaken, tithi)
+
+def would_be_adhikamasa(tithi: int) -> bool:
+    """See CalendarYear.would_be_adhikamasa()"""
+    # Eade says t >= 25, but then 2012 (t=24) would not be adhikamāsa.
+    return ((tithi >= 24 and tithi <= 29) or (tithi >= 0 and tithi <= 5))
+
+def would_be_adhikavara(kammacubala: int, avoman: int) -> bool:
+    """See CalendarYear.would_be_adhikavara()"""
+    if kammacubala <= 207:
+        # Suriya leap year. Both <= and < seems to work. Eade phrases it as <=.
+        return avoman <= 126
+    else:
+        # Eade says Avoman <= 137, but that doesn't work.
+        return avoman < 137
+
+def classify_adhikavara(year: int,
+                        is_adhikamasa: bool,
+                        prev_is_adhikamasa: bool,
+                        prev_would_be_vara: bool,
+                        cur_would_be_vara: bool,
+                        exceptions: Dict[int, bool]) -> bool:
+    """
+    The adhikavāra rule, used by CalendarYear.is_adhikavara(), classify_years()
+    and CalendarYearArray: the year from the ruleset exceptions, or not in an
+    adhikamāsa year, or carried over from an adhikamāsa year which would be
+    adhikavāra, or the year's own would_be_adhikavara().
+    """
+    if year in exceptions.keys():
+        return exceptions[year]
+
+    if is_adhikamasa:
+        return False
+
+    elif prev_is_adhikamasa and prev_would_be_vara:
+        # Carried adhikavāra from last year
+        return True
+
+    else:
+        return cur_would_be_vara
+
 class CalendarYear:
     year:        int # Common Era
     be_Year:     int # Buddhist Era, CE + 543
@@ -38,41 +173,45 @@ class CalendarYear:
     masaken:     int # Elapsed months of the era
     tithi:       int # Age of the moon at the start of the year, aka Thaloengsok or New Year's Day
     first_day:    datetime.date
+    engine:       "CalendarEngine" # The ruleset and caches used for the classification
+
+    # Memoized classification, filled in on first use.
+    _is_adhikamasa: Optional[bool]
+    _is_adhikavara: Optional[bool]
+    _asalha_puja:   Optional[datetime.date]
+
+    def __init__(self, ce_year: int, engine: Optional["CalendarEngine"] = None):
+        self.engine = engine if engine is not None else _default_engine()
+
+        self._is_adhikamasa = None
+        self._is_adhikavara = None
+        self._asalha_puja = None
 
-    def __init__(self, ce_year: int):
         self.year = ce_year
         self.be_year = self.year + BE_DIFF
         self.cs_year = self.year - CS_DIFF
 
-        # helper variables
-        a: int
-        b: int
-
         # Take CE 1963, CS 1325 (as in the paper: "Rules for Interpolation...")
+        # Horakhun = 483969, Kammacubala = 552, Uccabala = 1780, Avoman = 61, Masaken = 16388, Tithi = 23
 
-        # === A. Find the relevant values for the astronomical New Year ===
-
-        # +1 is another constant correction, H3
-        a = (self.cs_year * ERA_DAYS) + ERA_HORAKHUN
-        self.horakhun = int(floor(float(a/KAMMACUBALA_DAILY + 1)))
-        # Horakhun = 483969
-
-        self.kammacubala = KAMMACUBALA_DAILY - (a % KAMMACUBALA_DAILY)
-        # Kammacubala = 552
+        (self.horakhun,
+         self.kammacubala,
+         self.uccabala,
+         self.avoman,
+         self.masaken,
+         self.tithi) = suriya_year_values(self.cs_year)
 
-        self.uccabala = (self.horakhun + ERA_UCCABALA) % 3232
-        # Uccabala = 1780
+        table = self.engine.year_table
+        if table is not None and table.covers(self.year):
+            self._use_year_table(table)
 
-        a = (self.horakhun * CYCLE_DAILY) + ERA_AVOMAN
-        self.avoman = a % CYCLE_SOLAR
-        # Avoman = 61
+    def _use_year_table(self, table: YearTable):
+        year_type = table.year_type(self.year)
+        self._is_adhikamasa = (year_type == YearType.Adhikamasa)
+        # The table was generated with the exceptions of this ruleset, see load_year_table()
+        self._is_adhikavara = (year_type == YearType.Adhikavara)
 
-        b = int(floor(float(a) / CYCLE_SOLAR))
-        self.masaken = int(floor(float((b + ERA_MASAKEN + self.horakhun) / MONTH_LENGTH)))
-        # Masaken = 16388
-
-        self.tithi = (b + self.horakhun) % MONTH_LENGTH
-        # Tithi = 23
+        self._asalha_puja = datetime.date.fromordinal(table.asalha_puja_ordinal(self.year))
 
     def year_type(self) -> YearType:
         if self.is_adhikamasa():
@@ -83,28 +222,31 @@ class CalendarYear:
             return YearType.Normal
 
     def is_adhikamasa(self) -> bool:
-        # If next year also qualifies for adhikamāsa, then this year isn't
-        next_year = CalendarYear(self.year + 1)
-        return (not next_year.would_be_adhikamasa() and self.would_be_adhikamasa())
+        if self._is_adhikamasa is None:
+            # If next year also qualifies for adhikamāsa, then this year isn't
+            next_year = self.engine.calendar_year(self.year + 1)
+            self._is_adhikamasa = (not next_year.would_be_adhikamasa() and self.would_be_adhikamasa())
+
+        return self._is_adhikamasa
 
     def would_be_adhikamasa(self) -> bool:
-        t = self.tithi
-        # Eade says t >= 25, but then 2012 (t=24) would not be adhikamāsa.
-        return ((t >= 24 and t <= 29) or (t >= 0 and t <= 5))
+        return would_be_adhikamasa(self.tithi)
 
     def is_adhikavara(self) -> bool:
-        if USE_HISTORICAL_EXCEPTIONS \
-           and self.year in ADHIKAVARA_HISTORICAL_EXCEPTIONS.keys():
-                return ADHIKAVARA_HISTORICAL_EXCEPTIONS[self.year]
+        if self._is_adhikavara is None:
+            self._is_adhikavara = self._calculate_is_adhikavara()
 
-        if self.is_adhikamasa():
-            return False
+        return self._is_adhikavara
 
-        elif self.has_carried_adhikavara():
-            return True
+    def _calculate_is_adhikavara(self) -> bool:
+        last_year = self.engine.calendar_year(self.year - 1)
 
-        else:
-            return self.would_be_adhikavara()
+        return classify_adhikavara(self.year,
+                                   self.is_adhikamasa(),
+                                   last_year.is_adhikamasa(),
+                                   last_year.would_be_adhikavara(),
+                                   self.would_be_adhikavara(),
+                                   self.engine.ruleset.adhikavara_exceptions)
 
     def suriya_values_str(self) -> str:
         return SURIYA_YEAR_VALUES_FMT.format(self.year, self.be_year, self.cs_year, self.horakhun, self.kammacubala,
@@ -121,16 +263,10 @@ class CalendarYear:
         > in a leap year, if the avoman is 126 or less, the year will have an extra day
         > in a normal year, if the avoman is 137 or less the year will have an extra day.
         """
-
-        if self.is_suriya_leap():
-            # Both <= and < seems to work. Eade phrases it as <=.
-            return self.avoman <= 126
-        else:
-            # Eade says Avoman <= 137, but that doesn't work.
-            return self.avoman < 137
+        return would_be_adhikavara(self.kammacubala, self.avoman)
 
     def has_carried_adhikavara(self) -> bool:
-        last_year = CalendarYear(self.year - 1)
+        last_year = self.engine.calendar_year(self.year - 1)
         return (last_year.is_adhikamasa() and last_year.would_be_adhikavara())
 
     def adhikavara_cycle_pos(self) -> int:
@@ -143,34 +279,11 @@ class CalendarYear:
 
     def delta_adhikamasa(self) -> int:
         """Years since last adhikamāsa."""
-
-        year = self.year - 1
-        while True:
-            check = CalendarYear(year)
-            if check.is_adhikamasa():
-                return self.year - check.year
-            # Avoid looking forever.
-            if self.year-check.year > 6:
-                break
-            year -= 1
-
-        return -1
+        return self.year - self.engine.leap_year_index.previous_adhikamasa(self.year)
 
     def delta_adhikavara(self) -> int:
         """Years since last adhikavāra."""
-
-        year = self.year - 1
-        while True:
-            check = CalendarYear(year)
-            if check.is_adhikavara():
-                return self.year - check.year
-            # Avoid looking forever.
-            if self.year-check.year > 12:
-                break
-
-            year -= 1
-
-        return -1
+        return self.year - self.engine.leap_year_index.previous_adhikavara(self.year)
 
     def year_length(self) -> int:
         """Length of the lunar year in days."""
@@ -190,6 +303,12 @@ class CalendarYear:
     def asalha_puja(self) -> datetime.date:
         """Date of Asalha Puja"""
 
+        if self._asalha_puja is None:
+            self._asalha_puja = self._calculate_asalha_puja()
+
+        return self._asalha_puja
+
+    def _calculate_asalha_puja(self) -> datetime.date:
         # In a common year, Asalha Puja is the last day of the 8th month.
         days = 4 * (29 + 30)
 
@@ -207,38 +326,340 @@ class CalendarYear:
 
     def calculate_previous_kattika(self) -> datetime.date:
         """Calculate the kattika full moon before this year"""
+        return self.engine.kattika_table.kattika(self.year - 1)
+
+class YearCacheInfo(TypedDict):
+    hits:    int
+    misses:  int
+    maxsize: int
+    currsize: int
+
+class YearCache:
+    """
+    Size-bounded LRU cache of CalendarYear objects. Each CalendarEngine has
+    one for its ruleset.
+
+    The classification of a year (adhikamāsa, adhikavāra, Asalha Puja) is
+    memoized on the CalendarYear object itself, so a cached year carries its
+    derived values with it, and the neighbouring years it looks at are taken
+    from the same cache.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = YEAR_CACHE_MAXSIZE, engine: Optional["CalendarEngine"] = None):
+        self.maxsize = maxsize
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+        self._years: OrderedDict[int, CalendarYear] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ce_year: int) -> CalendarYear:
+        with self._lock:
+            cal_year = self._years.get(ce_year)
+            if cal_year is not None:
+                self._years.move_to_end(ce_year)
+                self.hits += 1
+                return cal_year
+
+            self.misses += 1
+
+        cal_year = CalendarYear(ce_year, self.engine)
+
+        with self._lock:
+            self._years[ce_year] = cal_year
+            while len(self._years) > self.maxsize:
+                self._years.popitem(last=False)
+
+        return cal_year
+
+    def year_type(self, ce_year: int) -> YearType:
+        return self.get(ce_year).year_type()
+
+    def year_length(self, ce_year: int) -> int:
+        return self.get(ce_year).year_length()
+
+    def asalha_puja(self, ce_year: int) -> datetime.date:
+        return self.get(ce_year).asalha_puja()
+
+    def info(self) -> YearCacheInfo:
+        with self._lock:
+            return YearCacheInfo(
+                hits = self.hits,
+                misses = self.misses,
+                maxsize = self.maxsize,
+                currsize = len(self._years),
+            )
+
+    def clear(self):
+        """Drop the cached years and reset the hit / miss counters."""
+        with self._lock:
+            self._years.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class KattikaTable:
+    """
+    Cumulative table of Kattika full moon dates, as date ordinals, for a
+    contiguous range of solar years.
+
+    The Kattika of year y is the Kattika of year y-1 plus the length of the
+    lunar year y. Starting from a known Kattika, the table is extended lazily
+    in either direction, and a lookup is an index into the list.
+    """
+
+    def __init__(self, year_cache: YearCache, year_table: Optional[YearTable] = None):
+        self._year_cache = year_cache
+        self._year_table = year_table
+        y, m, d = KATTIKA_EPOCH_DATE_TUPLE
+        self._first_year = y
+        self._ordinals: List[int] = [datetime.date(y, m, d).toordinal()]
+        self._lock = threading.Lock()
+
+    def kattika(self, ce_year: int) -> datetime.date:
+        """The Kattika full moon in the solar year ce_year."""
+        return datetime.date.fromordinal(self.kattika_ordinal(ce_year))
+
+    def kattika_ordinal(self, ce_year: int) -> int:
+        if self._year_table is not None and self._year_table.covers(ce_year + 1):
+            return self._year_table.prev_kattika_ordinal(ce_year + 1)
+
+        with self._lock:
+            idx = ce_year - self._first_year
+            if idx < 0 or idx >= len(self._ordinals):
+                self._extend(ce_year)
+                idx = ce_year - self._first_year
+
+            return self._ordinals[idx]
+
+    def _extend(self, ce_year: int):
+        last_year = self._first_year + len(self._ordinals) - 1
+
+        if ce_year > last_year:
+            to_year = ce_year + KATTIKA_TABLE_CHUNK
+            ordinal = self._ordinals[-1]
+            for y in range(last_year + 1, to_year + 1):
+                ordinal += self._year_cache.year_length(y)
+                self._ordinals.append(ordinal)
+
+        elif ce_year < self._first_year:
+            to_year = ce_year - KATTIKA_TABLE_CHUNK
+            ordinal = self._ordinals[0]
+            prepend: List[int] = []
+            for y in range(self._first_year - 1, to_year - 1, -1):
+                ordinal -= self._year_cache.year_length(y + 1)
+                prepend.append(ordinal)
+
+            prepend.reverse()
+            self._ordinals = prepend + self._ordinals
+            self._first_year = to_year
+
+
+class LeapYearIndex:
+    """
+    Sorted lists of the adhikamāsa and the adhikavāra years in a contiguous
+    range of years.
+
+    The range is extended lazily in chunks of years as queries reach outside
+    of it, and the queries are binary searches in the lists.
+    """
+
+    def __init__(self, year_cache: YearCache):
+        self._year_cache = year_cache
+        # Empty range to begin with
+        self._from_year = KATTIKA_EPOCH_DATE_TUPLE[0]
+        self._to_year = self._from_year - 1
+        self._adhikamasa: List[int] = []
+        self._adhikavara: List[int] = []
+        self._lock = threading.Lock()
+
+    def _classify(self, from_year: int, to_year: int) -> Tuple[List[int], List[int]]:
+        adhikamasa: List[int] = []
+        adhikavara: List[int] = []
+
+        for year in range(from_year, to_year + 1):
+            cal_year = self._year_cache.get(year)
+            if cal_year.is_adhikamasa():
+                adhikamasa.append(year)
+            if cal_year.is_adhikavara():
+                adhikavara.append(year)
+
+        return (adhikamasa, adhikavara)
+
+    def _cover(self, from_year: int, to_year: int):
+        """Extend the index to include the years from_year to to_year."""
+
+        with self._lock:
+            if to_year > self._to_year:
+                chunk_to = max(to_year, self._to_year + LEAP_YEAR_INDEX_CHUNK)
+                masa, vara = self._classify(self._to_year + 1, chunk_to)
+                self._adhikamasa.extend(masa)
+                self._adhikavara.extend(vara)
+                self._to_year = chunk_to
+
+            if from_year < self._from_year:
+                chunk_from = min(from_year, self._from_year - LEAP_YEAR_INDEX_CHUNK)
+                masa, vara = self._classify(chunk_from, self._from_year - 1)
+                self._adhikamasa = masa + self._adhikamasa
+                self._adhikavara = vara + self._adhikavara
+                self._from_year = chunk_from
+
+    def _previous(self, years_attr: str, ce_year: int) -> int:
+        self._cover(ce_year - 1, ce_year - 1)
+
+        while True:
+            years: List[int] = getattr(self, years_attr)
+            i = bisect_left(years, ce_year)
+            if i > 0:
+                return years[i - 1]
 
-        # Step from a known Kattika date as epoch date
-        kattika_date = datetime.date.fromisoformat("2015-11-25")
+            self._cover(self._from_year - LEAP_YEAR_INDEX_CHUNK, ce_year - 1)
 
-        # Determine the direction of stepping
-        direction: int
-        if kattika_date.year < self.year-1:
-            direction = 1
-        else:
-            direction = -1
+    def _next(self, years_attr: str, ce_year: int) -> int:
+        self._cover(ce_year + 1, ce_year + 1)
 
-        # Step in direction until the Kattika in the prev. solar year
-        y = kattika_date.year
-        while y != self.year-1:
-            check_year: CalendarYear
-            n: int
+        while True:
+            years: List[int] = getattr(self, years_attr)
+            i = bisect_right(years, ce_year)
+            if i < len(years):
+                return years[i]
 
-            if direction == 1:
-                check_year = CalendarYear(y + 1)
+            self._cover(ce_year + 1, self._to_year + LEAP_YEAR_INDEX_CHUNK)
 
-            else:
-                check_year = CalendarYear(y)
+    def previous_adhikamasa(self, ce_year: int) -> int:
+        """The last adhikamāsa year before ce_year."""
+        return self._previous('_adhikamasa', ce_year)
 
-            n = 6*29 + 6*30
+    def next_adhikamasa(self, ce_year: int) -> int:
+        """The first adhikamāsa year after ce_year."""
+        return self._next('_adhikamasa', ce_year)
 
-            if check_year.is_adhikamasa():
-                n += 30
-            elif check_year.is_adhikavara():
-                n += 1
+    def previous_adhikavara(self, ce_year: int) -> int:
+        """The last adhikavāra year before ce_year."""
+        return self._previous('_adhikavara', ce_year)
 
-            kattika_date = kattika_date + datetime.timedelta(days = (n*direction))
+    def next_adhikavara(self, ce_year: int) -> int:
+        """The first adhikavāra year after ce_year."""
+        return self._next('_adhikavara', ce_year)
 
-            y += direction
+    def leap_years_between(self,
+                           from_year: int,
+                           to_year: int,
+                           year_type: Optional[YearType] = None) -> List[int]:
+        """
+        The adhikamāsa and adhikavāra years from from_year to to_year
+        (inclusive) in order, or only those of the given year_type.
+        """
 
-        return kattika_date
+        self._cover(from_year, to_year)
+
+        def _between(years: List[int]) -> List[int]:
+            return years[bisect_left(years, from_year):bisect_right(years, to_year)]
+
+        if year_type == YearType.Adhikamasa:
+            return _between(self._adhikamasa)
+        elif year_type == YearType.Adhikavara:
+            return _between(self._adhikavara)
+        elif year_type == YearType.Normal:
+            raise ValueError("leap_years_between() takes the Adhikamasa or Adhikavara year type")
+
+        return sorted(set(_between(self._adhikamasa) + _between(self._adhikavara)))
+
+
+class YearClassification(NamedTuple):
+    year:         int
+    year_type:    YearType
+    year_length:  int
+    kattika_date: datetime.date # The Kattika full moon before the year
+    asalha_puja:  datetime.date
+
+def classify_years(from_year: int,
+                   to_year: int,
+                   engine: Optional["CalendarEngine"] = None,
+                   ) -> Iterator[YearClassification]:
+    """
+    Classify the years from_year to to_year (inclusive) in order.
+
+    A year's classification depends only on the previous and the next year,
+    so this keeps a window of three years and calculates the values of each
+    year once, without building CalendarYear objects. The Kattika dates are
+    accumulated from the Kattika before from_year.
+    """
+
+    for c, _ in classify_years_with_values(from_year, to_year, engine):
+        yield c
+
+def classify_years_with_values(from_year: int,
+                               to_year: int,
+                               engine: Optional["CalendarEngine"] = None,
+                               ) -> Iterator[Tuple[YearClassification, SuriyaYearValues]]:
+    """The classify_years() of each year with its suriya_year_values()."""
+
+    if engine is None:
+        engine = _default_engine()
+
+    exceptions = engine.ruleset.adhikavara_exceptions
+
+    def _values(year: int) -> Tuple[SuriyaYearValues, bool, bool]:
+        values = suriya_year_values(year - CS_DIFF)
+        (_, kammacubala, _, avoman, _, tithi) = values
+        return (values, would_be_adhikamasa(tithi), would_be_adhikavara(kammacubala, avoman))
+
+    _, prev_masa, prev_vara = _values(from_year - 1)
+    cur_values, cur_masa, cur_vara = _values(from_year)
+
+    # If next year also qualifies for adhikamāsa, then this year isn't
+    prev_is_adhikamasa = prev_masa and not cur_masa
+
+    kattika = engine.kattika_table.kattika_ordinal(from_year - 1)
+
+    for year in range(from_year, to_year + 1):
+        next_values, next_masa, next_vara = _values(year + 1)
+
+        is_adhikamasa = cur_masa and not next_masa
+
+        is_adhikavara = classify_adhikavara(year, is_adhikamasa, prev_is_adhikamasa, prev_vara, cur_vara, exceptions)
+
+        if is_adhikamasa:
+            year_type = YearType.Adhikamasa
+        elif is_adhikavara:
+            year_type = YearType.Adhikavara
+        else:
+            year_type = YearType.Normal
+
+        c = YearClassification(
+            year = year,
+            year_type = year_type,
+            year_length = YEAR_LENGTH_DAYS[year_type],
+            kattika_date = datetime.date.fromordinal(kattika),
+            asalha_puja = datetime.date.fromordinal(kattika + ASALHA_PUJA_DAYS[year_type]),
+        )
+        yield (c, cur_values)
+
+        kattika += YEAR_LENGTH_DAYS[year_type]
+        prev_is_adhikamasa, prev_vara = is_adhikamasa, cur_vara
+        cur_values, cur_masa, cur_vara = next_values, next_masa, next_vara
+
+def next_adhikamasa(ce_year: int) -> int:
+    """The first adhikamāsa year after ce_year."""
+    return _default_engine().leap_year_index.next_adhikamasa(ce_year)
+
+def previous_adhikamasa(ce_year: int) -> int:
+    """The last adhikamāsa year before ce_year."""
+    return _default_engine().leap_year_index.previous_adhikamasa(ce_year)
+
+def next_adhikavara(ce_year: int) -> int:
+    """The first adhikavāra year after ce_year."""
+    return _default_engine().leap_year_index.next_adhikavara(ce_year)
+
+def previous_adhikavara(ce_year: int) -> int:
+    """The last adhikavāra year before ce_year."""
+    return _default_engine().leap_year_index.previous_adhikavara(ce_year)
+
+def leap_years_between(from_year: int, to_year: int, year_type: Optional[YearType] = None) -> List[int]:
+    """The adhikamāsa and adhikavāra years from from_year to to_year (inclusive)."""
+    return _default_engine().leap_year_index.leap_years_between(from_year, to_year, year_type)
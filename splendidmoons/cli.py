@@ -1,9 +1,15 @@
-import csv, json
-from typing import List, Optional, TypedDict
+import datetime
+from pathlib import Path
+from typing import Optional
 import typer
 
-from splendidmoons.event_helpers import CalendarEvent, parse_annual_events_csv, year_moondays, year_moondays_associated_events
+from splendidmoons.event_helpers import CalendarEvent, calendar_event_to_str, iter_events, write_events_csv, write_events_json
 from splendidmoons.calendar_year import CalendarYear
+from splendidmoons.calendar_day import verify_suriya_arithmetic
+from splendidmoons.json_cal_day import iter_json_cal_days, write_day_records_json, write_day_records_jsonl
+from splendidmoons.raek_index import RaekIndex
+from splendidmoons.sqlite_export import query_events, write_events_sqlite
+from splendidmoons.year_table import YEAR_TABLE_DATA_PATH, YEAR_TABLE_FROM_YEAR, YEAR_TABLE_TO_YEAR, write_year_table_module
 from splendidmoons.ical import IcalVEvent, ical_vevent, write_ical
 
 app = typer.Typer()
@@ -18,56 +24,53 @@ def asalha_puja(common_era_year: int):
     cal_year = CalendarYear(common_era_year)
     print(cal_year.asalha_puja())
 
-def _collect_events(from_year: int,
-                    to_year: int,
-                    annual_events_csv_path: Optional[str] = None,
-                    ) -> List[CalendarEvent]:
-
-    events: List[CalendarEvent] = []
+@app.command()
+def verify_arithmetic(from_year: int, to_year: int):
+    """Cross-check the integer year and day values against the earlier float calculation."""
+    mismatches = verify_suriya_arithmetic(from_year, to_year)
 
-    year = from_year
-    while year <= to_year:
-        events.extend(year_moondays(year))
-        events.extend(year_moondays_associated_events(year))
-        if annual_events_csv_path is not None:
-            events.extend(parse_annual_events_csv(year, annual_events_csv_path))
+    for m in mismatches:
+        print(f"{m['year']} day {m['day']} {m['name']}: {m['exact']} != {m['legacy']}")
 
-        year += 1
+    print(f"{len(mismatches)} mismatches in {from_year}-{to_year}")
 
-    events = sorted(events, key=lambda x: x['date'])
+@app.command()
+def generate_year_table(from_year: int = YEAR_TABLE_FROM_YEAR,
+                        to_year: int = YEAR_TABLE_TO_YEAR,
+                        path: str = str(YEAR_TABLE_DATA_PATH)):
+    """Write the precomputed year classification module."""
+    write_year_table_module(Path(path), from_year, to_year)
 
-    return events
+@app.command()
+def generate_raek_index(from_year: int, to_year: int, path: str):
+    """Write the lunar mansion of each day to a raek index file."""
+    RaekIndex.build(from_year, to_year).save(Path(path))
 
 @app.command()
 def year_events_csv(from_year: int,
                     to_year: int,
                     csv_path: str,
                     delimiter = ',',
-                    annual_events_csv_path: Optional[str] = None):
-
-    events = _collect_events(from_year, to_year, annual_events_csv_path)
+                    annual_events_csv_path: Optional[str] = None,
+                    jobs: int = 1):
 
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f,
-                                fieldnames=events[0].keys(),
-                                delimiter=delimiter)
+    events = iter_events(from_year, to_year, annual_events_csv_path, jobs)
 
-        writer.writeheader()
-        for row in events:
-            writer.writerow(row)
+    write_events_csv(events, csv_path, delimiter)
 
 @app.command()
 def year_events_ical(from_year: int,
                     to_year: int,
                     ical_path: str,
-                    annual_events_csv_path: Optional[str] = None):
+                    annual_events_csv_path: Optional[str] = None,
+                    jobs: int = 1):
 
-    events = _collect_events(from_year, to_year, annual_events_csv_path)
+    events = iter_events(from_year, to_year, annual_events_csv_path, jobs)
 
     def _to_vevent(x: CalendarEvent) -> IcalVEvent:
         return ical_vevent(x['date'], x['note'])
 
-    ical_vevents = [_to_vevent(x) for x in events]
+    ical_vevents = (_to_vevent(x) for x in events)
 
     write_ical(ical_vevents, ical_path)
 
@@ -75,35 +78,56 @@ def year_events_ical(from_year: int,
 def year_events_json(from_year: int,
                      to_year: int,
                      json_path: str,
-                     annual_events_csv_path: Optional[str] = None):
-
-    events = _collect_events(from_year, to_year, annual_events_csv_path)
-
-    class JsonEvent(TypedDict):
-        date: str
-        day_text: str
-        note: str
-        label: str
-        phase: str
-        season: str
-        season_number: int
-        season_total: int
-        days: int
-
-    def _to_json_event(x: CalendarEvent) -> JsonEvent:
-        return JsonEvent(
-            date = x['date'].isoformat(),
-            day_text = x['day_text'],
-            note = x['note'],
-            label = x['label'],
-            phase = x['phase'],
-            season = x['season'],
-            season_number = x['season_number'],
-            season_total = x['season_total'],
-            days = x['days'],
-        )
-
-    json_events = [_to_json_event(x) for x in events]
-
-    with open(json_path, 'w', encoding='utf-8') as f:
-        f.write(json.dumps(json_events))
+                     annual_events_csv_path: Optional[str] = None,
+                     jobs: int = 1):
+
+    events = iter_events(from_year, to_year, annual_events_csv_path, jobs)
+
+    write_events_json(events, json_path)
+
+@app.command()
+def year_events_sqlite(from_year: int,
+                       to_year: int,
+                       db_path: str,
+                       annual_events_csv_path: Optional[str] = None,
+                       jobs: int = 1):
+    """Write the years and the events to an SQLite database."""
+
+    write_events_sqlite(db_path, from_year, to_year, annual_events_csv_path, jobs)
+
+@app.command()
+def query(db_path: str,
+          from_date: Optional[str] = None,
+          to_date: Optional[str] = None,
+          label: Optional[str] = None,
+          phase: Optional[str] = None,
+          season: Optional[str] = None):
+    """Print the events in a database from year-events-sqlite. Dates are YYYY-MM-DD."""
+
+    events = query_events(db_path,
+                          None if from_date is None else datetime.date.fromisoformat(from_date),
+                          None if to_date is None else datetime.date.fromisoformat(to_date),
+                          label,
+                          phase,
+                          season)
+
+    for e in events:
+        print(f"{e['date'].isoformat()} {calendar_event_to_str(e)}")
+
+@app.command()
+def day_records_json(from_year: int,
+                     to_year: int,
+                     json_path: str):
+    """Write the uposatha, half moon and event records of each day as a JSON list."""
+
+    days = iter_json_cal_days(datetime.date(from_year, 1, 1), datetime.date(to_year, 12, 31))
+    write_day_records_json(days, json_path)
+
+@app.command()
+def day_records_jsonl(from_year: int,
+                      to_year: int,
+                      jsonl_path: str):
+    """Write the uposatha, half moon and event records of each day as JSON Lines."""
+
+    days = iter_json_cal_days(datetime.date(from_year, 1, 1), datetime.date(to_year, 12, 31))
+    write_day_records_jsonl(days, jsonl_path)
@@ -0,0 +1,211 @@
+"""
+A CalendarEngine calculates the calendar with one ruleset and keeps its caches.
+Engines of different rulesets don't share any state.
+"""
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+import datetime
+import threading
+
+import splendidmoons
+from splendidmoons import ADHIKAVARA_HISTORICAL_EXCEPTIONS
+from splendidmoons.calendar_year import (YEAR_CACHE_MAXSIZE, CalendarYear, KattikaTable, LeapYearIndex, YearCache,
+                                         YearClassification, YearType, classify_years)
+from splendidmoons.year_table import YearTable, load_year_table
+
+if TYPE_CHECKING:
+    from splendidmoons.event_helpers import CalendarAssocEvent, CalendarEvent
+    from splendidmoons.ical import HasIcalEvent
+    from splendidmoons.json_cal_day import CalDayIndex
+    from splendidmoons.uposatha_moon import UposathaIndex, UposathaMoon
+
+@dataclass(frozen=True)
+class Ruleset:
+    """
+    The rules of a calendar. The adhikavāra exceptions replace the calculated
+    adhikavāra for the years where an official calendar differed from the
+    formulas.
+
+    Rulesets compare and hash by the name and the exceptions, which are copied
+    when the ruleset is created and must not be changed after that.
+    """
+
+    name: str
+    adhikavara_exceptions: Dict[int, bool] = field(default_factory=dict)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'adhikavara_exceptions', dict(self.adhikavara_exceptions))
+
+    def __hash__(self) -> int:
+        return hash((self.name, frozenset(self.adhikavara_exceptions.items())))
+
+# Calendar data which is "pure" in its consistency.
+PURE_RULESET = Ruleset("pure")
+
+# Matches official past calendars which differed from the regular pattern.
+HISTORICAL_RULESET = Ruleset("historical", ADHIKAVARA_HISTORICAL_EXCEPTIONS)
+
+RULESETS: Dict[str, Ruleset] = {
+    PURE_RULESET.name: PURE_RULESET,
+    HISTORICAL_RULESET.name: HISTORICAL_RULESET,
+}
+
+class CalendarEngine:
+    ruleset:         Ruleset
+    year_table:      Optional[YearTable]
+    year_cache:      YearCache
+    kattika_table:   KattikaTable
+    leap_year_index: LeapYearIndex
+
+    _uposatha_index: Optional["UposathaIndex"]
+
+    def __init__(self, ruleset: Ruleset = PURE_RULESET, year_cache_maxsize: int = YEAR_CACHE_MAXSIZE):
+        self.ruleset = ruleset
+        self.year_table = load_year_table(ruleset.adhikavara_exceptions)
+        self.year_cache = YearCache(year_cache_maxsize, self)
+        self.kattika_table = KattikaTable(self.year_cache, self.year_table)
+        self.leap_year_index = LeapYearIndex(self.year_cache)
+        self._uposatha_index = None
+
+    def clear(self):
+        """Drop the cached years, the Kattika table, the leap year index and the uposatha index."""
+        self.year_cache.clear()
+        self.kattika_table = KattikaTable(self.year_cache, self.year_table)
+        self.leap_year_index = LeapYearIndex(self.year_cache)
+        self._uposatha_index = None
+
+    @property
+    def uposatha_index(self) -> "UposathaIndex":
+        # Created on first use, uposatha_moon imports this module.
+        if self._uposatha_index is None:
+            from splendidmoons.uposatha_moon import UposathaIndex
+            self._uposatha_index = UposathaIndex(self)
+        return self._uposatha_index
+
+    # === Years ===
+
+    def calendar_year(self, ce_year: int) -> CalendarYear:
+        return self.year_cache.get(ce_year)
+
+    def year_type(self, ce_year: int) -> YearType:
+        return self.year_cache.get(ce_year).year_type()
+
+    def year_length(self, ce_year: int) -> int:
+        return self.year_cache.get(ce_year).year_length()
+
+    def asalha_puja(self, ce_year: int) -> datetime.date:
+        return self.year_cache.get(ce_year).asalha_puja()
+
+    def previous_kattika(self, ce_year: int) -> datetime.date:
+        """The Kattika full moon before the year."""
+        return self.kattika_table.kattika(ce_year - 1)
+
+    def classify_years(self, from_year: int, to_year: int) -> Iterator[YearClassification]:
+        return classify_years(from_year, to_year, self)
+
+    def next_adhikamasa(self, ce_year: int) -> int:
+        return self.leap_year_index.next_adhikamasa(ce_year)
+
+    def previous_adhikamasa(self, ce_year: int) -> int:
+        return self.leap_year_index.previous_adhikamasa(ce_year)
+
+    def next_adhikavara(self, ce_year: int) -> int:
+        return self.leap_year_index.next_adhikavara(ce_year)
+
+    def previous_adhikavara(self, ce_year: int) -> int:
+        return self.leap_year_index.previous_adhikavara(ce_year)
+
+    def leap_years_between(self, from_year: int, to_year: int, year_type: Optional[YearType] = None) -> List[int]:
+        return self.leap_year_index.leap_years_between(from_year, to_year, year_type)
+
+    # === Calendar generation ===
+
+    # Imported in the methods, these modules import this one.
+
+    def generate_solar_year(self, ce_year: int) -> List["HasIcalEvent"]:
+        from splendidmoons.json_cal_day import generate_solar_year
+        return generate_solar_year(ce_year, self)
+
+    def iter_uposathas(self, start_date: datetime.date, end_date: Optional[datetime.date] = None) -> Iterator["UposathaMoon"]:
+        from splendidmoons.uposatha_moon import iter_uposathas
+        return iter_uposathas(start_date, end_date, self)
+
+    def advance_uposatha(self, moon: "UposathaMoon", n: int) -> "UposathaMoon":
+        from splendidmoons.uposatha_moon import advance
+        return advance(moon, n, self)
+
+    def uposatha_at(self, date: datetime.date, index: int) -> "UposathaMoon":
+        from splendidmoons.uposatha_moon import uposatha_at
+        return uposatha_at(date, index, self)
+
+    def is_uposatha(self, date: datetime.date) -> bool:
+        return self.uposatha_index.is_uposatha(date)
+
+    def uposatha_on(self, date: datetime.date) -> Optional["UposathaMoon"]:
+        return self.uposatha_index.uposatha_on(date)
+
+    def next_uposatha_after(self, date: datetime.date) -> "UposathaMoon":
+        return self.uposatha_index.next_uposatha_after(date)
+
+    def previous_uposatha_before(self, date: datetime.date) -> "UposathaMoon":
+        return self.uposatha_index.previous_uposatha_before(date)
+
+    def get_json_cal_days(self, from_date: datetime.date, to_date: datetime.date) -> "CalDayIndex":
+        from splendidmoons.json_cal_day import get_json_cal_days
+        return get_json_cal_days(from_date, to_date, self)
+
+    def year_moondays(self, ce_year: int, moon_phase_day_text: Optional[Dict[str, str]] = None) -> List["CalendarEvent"]:
+        from splendidmoons.event_helpers import MOON_PHASE_DAY_TEXT, year_moondays
+        if moon_phase_day_text is None:
+            moon_phase_day_text = MOON_PHASE_DAY_TEXT
+        return year_moondays(ce_year, moon_phase_day_text, self)
+
+    def year_moondays_associated_events(self,
+                                        ce_year: int,
+                                        assoc_events: Optional[Dict[str, List["CalendarAssocEvent"]]] = None,
+                                        show_month_names = False,
+                                        show_adhikamasa_adhikavara = False,
+                                        ) -> List["CalendarEvent"]:
+        from splendidmoons.event_helpers import year_moondays_associated_events
+        return year_moondays_associated_events(ce_year, assoc_events, show_month_names, show_adhikamasa_adhikavara, self)
+
+    def iter_calendar_events(self,
+                             from_date: datetime.date,
+                             to_date: datetime.date,
+                             moon_phase_day_text: Optional[Dict[str, str]] = None,
+                             assoc_events: Optional[Dict[str, List["CalendarAssocEvent"]]] = None,
+                             show_month_names = False,
+                             show_adhikamasa_adhikavara = False,
+                             ) -> Iterator["CalendarEvent"]:
+        from splendidmoons.event_helpers import MOON_PHASE_DAY_TEXT, iter_calendar_events
+        if moon_phase_day_text is None:
+            moon_phase_day_text = MOON_PHASE_DAY_TEXT
+        return iter_calendar_events(from_date, to_date, moon_phase_day_text, assoc_events,
+                                    show_month_names, show_adhikamasa_adhikavara, self)
+
+_ENGINES: Dict[Ruleset, CalendarEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+def engine_for(ruleset: Ruleset) -> CalendarEngine:
+    """The shared engine of a ruleset, by the ruleset's name and exceptions."""
+
+    engine = _ENGINES.get(ruleset)
+    if engine is not None:
+        return engine
+
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(ruleset)
+        if engine is None:
+            engine = CalendarEngine(ruleset)
+            _ENGINES[ruleset] = engine
+
+    return engine
+
+def default_engine() -> CalendarEngine:
+    """The shared engine of the ruleset selected with splendidmoons.USE_HISTORICAL_EXCEPTIONS."""
+
+    if splendidmoons.USE_HISTORICAL_EXCEPTIONS:
+        return engine_for(HISTORICAL_RULESET)
+    else:
+        return engine_for(PURE_RULESET)
@@ -1,3 +1,4 @@
+from typing import Dict
 import datetime
 
 from splendidmoons.ical import HasIcalEvent
@@ -15,6 +16,13 @@ class Event(HasIcalEvent):
     def __init__(self):
         pass
 
+    def to_dict(self) -> Dict:
+        return {
+            "date": self.date.isoformat(),
+            "summary": self.summary,
+            "description": self.description,
+        }
+
 """
 Type for major calendar events for convenience.
 
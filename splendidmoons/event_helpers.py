@@ -1,12 +1,21 @@
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import calendar
 import csv
-from typing import List, TypedDict, Dict, Optional
+import heapq
+import json
+from typing import Deque, Iterable, Iterator, List, Tuple, TypedDict, Dict, Optional
 import datetime
-from splendidmoons.calendar_consts import BE_DIFF
+import os
+import threading
 
-from splendidmoons.calendar_year import CalendarYear, YearType
+from splendidmoons.calendar_year import YearType
+from splendidmoons.engine import CalendarEngine, Ruleset, default_engine, engine_for
 from splendidmoons.helpers import SEASON_NAME
-from splendidmoons.json_cal_day import get_json_cal_days
-from splendidmoons.uposatha_moon import MONTH_NAMES, UposathaMoon
+from splendidmoons.json_cal_day import HALF_MOON_DAYS, get_json_cal_days
+from splendidmoons.half_moon import HalfMoon
+from splendidmoons.uposatha_moon import MONTH_NAMES, UposathaMoon, iter_uposathas
 
 class CalendarEvent(TypedDict):
     date: datetime.date
@@ -46,6 +55,7 @@ def calendar_event_to_str(e: CalendarEvent) -> str:
 
 def year_moondays(ce_year: int,
                   moon_phase_day_text: Dict[str, str] = MOON_PHASE_DAY_TEXT,
+                  engine: Optional[CalendarEngine] = None,
                   ) -> List[CalendarEvent]:
 
     from_date = datetime.date(ce_year, 1, 1)
@@ -53,54 +63,62 @@ def year_moondays(ce_year: int,
 
     events: List[CalendarEvent] = []
 
-    days = get_json_cal_days(from_date, to_date)
+    days = get_json_cal_days(from_date, to_date, engine)
 
     for d in days:
-        phase, label, season = "", "", ""
-        season_number, season_total, days = 0, 0, 0
-
         if d.uposatha_moon is not None:
-            u = d.uposatha_moon
-            phase = u.phase
-            label = u.event
-            season_number = u.s_number
-            season_total = u.s_total
-            days = u.u_days
-
-            if u.lunar_season == 1:
-                season = "Hemanta"
-            elif u.lunar_season == 2:
-                season = "Gimha"
-            elif u.lunar_season == 3:
-                season = "Vassāna"
+            events.append(moonday_event(d.date, d.uposatha_moon, None, moon_phase_day_text))
 
         elif d.half_moon is not None:
-            phase = d.half_moon.phase
-
-        else:
-            continue
-
-        if phase in moon_phase_day_text.keys():
-            day_text = moon_phase_day_text[phase]
-        else:
-            day_text = ""
-
-        events.append(
-            CalendarEvent(
-                date = d.date,
-                day_text = day_text,
-                note = "",
-                label = label,
-                phase = phase,
-                season = season,
-                season_number = season_number,
-                season_total = season_total,
-                days = days,
-            )
-        )
+            events.append(moonday_event(d.date, None, d.half_moon, moon_phase_day_text))
 
     return events
 
+def moonday_event(date: datetime.date,
+                  uposatha: Optional[UposathaMoon],
+                  half_moon: Optional[HalfMoon],
+                  moon_phase_day_text: Dict[str, str] = MOON_PHASE_DAY_TEXT,
+                  ) -> CalendarEvent:
+    """The moonday event of an uposatha or a half moon on the date."""
+
+    phase, label, season = "", "", ""
+    season_number, season_total, days = 0, 0, 0
+
+    if uposatha is not None:
+        u = uposatha
+        phase = u.phase
+        label = u.event
+        season_number = u.s_number
+        season_total = u.s_total
+        days = u.u_days
+
+        if u.lunar_season == 1:
+            season = "Hemanta"
+        elif u.lunar_season == 2:
+            season = "Gimha"
+        elif u.lunar_season == 3:
+            season = "Vassāna"
+
+    elif half_moon is not None:
+        phase = half_moon.phase
+
+    if phase in moon_phase_day_text.keys():
+        day_text = moon_phase_day_text[phase]
+    else:
+        day_text = ""
+
+    return CalendarEvent(
+        date = date,
+        day_text = day_text,
+        note = "",
+        label = label,
+        phase = phase,
+        season = season,
+        season_number = season_number,
+        season_total = season_total,
+        days = days,
+    )
+
 class CalendarAssocEvent(TypedDict):
     day_text: str
     note: str
@@ -154,6 +172,7 @@ def year_moondays_associated_events(ce_year: int,
                                     assoc_events: Optional[Dict[str, List[CalendarAssocEvent]]] = None,
                                     show_month_names = False,
                                     show_adhikamasa_adhikavara = False,
+                                    engine: Optional[CalendarEngine] = None,
                                     ) -> List[CalendarEvent]:
     """
     Collect the major moondays and add associated events.
@@ -165,144 +184,449 @@ def year_moondays_associated_events(ce_year: int,
     if assoc_events is None:
         assoc_events = ASSOC_EVENTS
 
-    cal_year = CalendarYear(ce_year)
-
-    prev_kattika = cal_year.calculate_previous_kattika()
-
-    lu = UposathaMoon()
-    lu.date =         prev_kattika
-    lu.phase =        "full"
-    lu.s_number =     8
-    lu.s_total =      8
-    lu.u_days =       15
-    lu.m_days =       29
-    lu.lunar_month =  12
-    lu.lunar_season = 3
-    lu.lunar_year =   prev_kattika.year + BE_DIFF
-
-    last_uposatha = lu
-
-    while last_uposatha.date.year <= ce_year:
-        uposatha: UposathaMoon = last_uposatha.next_uposatha()
-        last_uposatha = uposatha
-
-        if uposatha.date.year != ce_year:
-            continue
-
-        # Add month names to Full Moons.
-
-        if show_month_names and uposatha.phase == "full":
-            n = uposatha.lunar_month
-            if n == 13:
-                month_number = "8/8"
-            else:
-                month_number = str(n)
-            month_name = f"{MONTH_NAMES[uposatha.lunar_month]} ({month_number})"
-
-            e = CalendarEvent(
-                date = uposatha.date,
-                day_text = month_name,
-                note = month_name,
-                label = "month-name",
-                phase = uposatha.phase,
-                season = SEASON_NAME[uposatha.lunar_season],
-                season_number = uposatha.s_number,
-                season_total = uposatha.s_total,
-                days = uposatha.u_days,
-            )
-            events.append(e)
-
-        # Add associated events for each major event.
-
-        for k in ["magha", "vesakha", "asalha", "pavarana"]:
-            if uposatha.event == k \
-                and k in assoc_events.keys():
-
-                for e in assoc_events[k]:
-                    if e['label'] == 'first-day':
-                        e = CalendarEvent(
-                            date = uposatha.date + datetime.timedelta(days=1),
-                            day_text = e['day_text'],
-                            note = e['note'],
-                            label = e['label'],
-                            phase = "",
-                            season = "",
-                            season_number = 0,
-                            season_total = 0,
-                            days = 0,
-                        )
-
-                    else:
-                        e = CalendarEvent(
-                            date = uposatha.date,
-                            day_text = e['day_text'],
-                            note = e['note'],
-                            label = e['label'],
-                            phase = uposatha.phase,
-                            season = SEASON_NAME[uposatha.lunar_season],
-                            season_number = uposatha.s_number,
-                            season_total = uposatha.s_total,
-                            days = uposatha.u_days,
-                        )
-
-                    events.append(e)
-
-        # Add Adhikamasa and Adhikavara events.
-
-        if show_adhikamasa_adhikavara:
-            if cal_year.year_type() == YearType.Adhikamasa:
-                # Full Moon of 2nd Asalha, 10th Uposatha of Gimha (10/10)
-                # New Moon of 2nd Asalha, 1st Uposatha of Vassana (1/8)
-                if (uposatha.lunar_season == 2 and uposatha.s_number == 10) \
-                   or (uposatha.lunar_season == 3 and uposatha.s_number == 1):
+    if engine is None:
+        engine = default_engine()
+
+    cal_year = engine.calendar_year(ce_year)
+
+    from_date = datetime.date(ce_year, 1, 1)
+    to_date = datetime.date(ce_year, 12, 31)
+
+    for uposatha in iter_uposathas(from_date, to_date, engine):
+        events.extend(uposatha_associated_events(uposatha,
+                                                 cal_year.year_type(),
+                                                 assoc_events,
+                                                 show_month_names,
+                                                 show_adhikamasa_adhikavara))
+
+    return events
+
+def uposatha_associated_events(uposatha: UposathaMoon,
+                               year_type: YearType,
+                               assoc_events: Dict[str, List[CalendarAssocEvent]] = ASSOC_EVENTS,
+                               show_month_names = False,
+                               show_adhikamasa_adhikavara = False,
+                               ) -> List[CalendarEvent]:
+    """
+    The month name, associated and adhikamāsa / adhikavāra events of an
+    uposatha. The year_type is of the solar year of the uposatha.
+    """
+
+    events: List[CalendarEvent] = []
+
+    # Add month names to Full Moons.
+
+    if show_month_names and uposatha.phase == "full":
+        n = uposatha.lunar_month
+        if n == 13:
+            month_number = "8/8"
+        else:
+            month_number = str(n)
+        month_name = f"{MONTH_NAMES[uposatha.lunar_month]} ({month_number})"
+
+        e = CalendarEvent(
+            date = uposatha.date,
+            day_text = month_name,
+            note = month_name,
+            label = "month-name",
+            phase = uposatha.phase,
+            season = SEASON_NAME[uposatha.lunar_season],
+            season_number = uposatha.s_number,
+            season_total = uposatha.s_total,
+            days = uposatha.u_days,
+        )
+        events.append(e)
+
+    # Add associated events for each major event.
+
+    for k in ["magha", "vesakha", "asalha", "pavarana"]:
+        if uposatha.event == k \
+            and k in assoc_events.keys():
+
+            for e in assoc_events[k]:
+                if e['label'] == 'first-day':
                     e = CalendarEvent(
-                        date = uposatha.date,
-                        day_text = "Adhikamāsa",
-                        note = "Adhikamāsa",
-                        label = "adhikamasa",
-                        phase = uposatha.phase,
-                        season = SEASON_NAME[uposatha.lunar_season],
-                        season_number = uposatha.s_number,
-                        season_total = uposatha.s_total,
-                        days = uposatha.u_days,
+                        date = uposatha.date + datetime.timedelta(days=1),
+                        day_text = e['day_text'],
+                        note = e['note'],
+                        label = e['label'],
+                        phase = "",
+                        season = "",
+                        season_number = 0,
+                        season_total = 0,
+                        days = 0,
                     )
-                    events.append(e)
 
-            elif cal_year.year_type() == YearType.Adhikavara:
-                if uposatha.has_adhikavara:
+                else:
                     e = CalendarEvent(
                         date = uposatha.date,
-                        day_text = "Adhikavāra",
-                        note = "Adhikavāra",
-                        label = "adhikavara",
+                        day_text = e['day_text'],
+                        note = e['note'],
+                        label = e['label'],
                         phase = uposatha.phase,
                         season = SEASON_NAME[uposatha.lunar_season],
                         season_number = uposatha.s_number,
                         season_total = uposatha.s_total,
                         days = uposatha.u_days,
                     )
-                    events.append(e)
+
+                events.append(e)
+
+    # Add Adhikamasa and Adhikavara events.
+
+    if show_adhikamasa_adhikavara:
+        if year_type == YearType.Adhikamasa:
+            # Full Moon of 2nd Asalha, 10th Uposatha of Gimha (10/10)
+            # New Moon of 2nd Asalha, 1st Uposatha of Vassana (1/8)
+            if (uposatha.lunar_season == 2 and uposatha.s_number == 10) \
+               or (uposatha.lunar_season == 3 and uposatha.s_number == 1):
+                e = CalendarEvent(
+                    date = uposatha.date,
+                    day_text = "Adhikamāsa",
+                    note = "Adhikamāsa",
+                    label = "adhikamasa",
+                    phase = uposatha.phase,
+                    season = SEASON_NAME[uposatha.lunar_season],
+                    season_number = uposatha.s_number,
+                    season_total = uposatha.s_total,
+                    days = uposatha.u_days,
+                )
+                events.append(e)
+
+        elif year_type == YearType.Adhikavara:
+            if uposatha.has_adhikavara:
+                e = CalendarEvent(
+                    date = uposatha.date,
+                    day_text = "Adhikavāra",
+                    note = "Adhikavāra",
+                    label = "adhikavara",
+                    phase = uposatha.phase,
+                    season = SEASON_NAME[uposatha.lunar_season],
+                    season_number = uposatha.s_number,
+                    season_total = uposatha.s_total,
+                    days = uposatha.u_days,
+                )
+                events.append(e)
 
     return events
 
-def parse_annual_events_csv(ce_year: int, csv_path: str) -> List[CalendarEvent]:
-    events: List[CalendarEvent] = []
+def iter_calendar_events(from_date: datetime.date,
+                         to_date: datetime.date,
+                         moon_phase_day_text: Dict[str, str] = MOON_PHASE_DAY_TEXT,
+                         assoc_events: Optional[Dict[str, List[CalendarAssocEvent]]] = None,
+                         show_month_names = False,
+                         show_adhikamasa_adhikavara = False,
+                         engine: Optional[CalendarEngine] = None,
+                         ) -> Iterator[CalendarEvent]:
+    """
+    The events of year_moondays() and year_moondays_associated_events() from
+    from_date to to_date, with one walk of the uposathas for the whole range.
+
+    The events are in date order. On the same date the moonday comes first,
+    then the associated events, in the order of sorting the two lists together
+    by date.
+    """
+
+    if assoc_events is None:
+        assoc_events = ASSOC_EVENTS
+
+    if engine is None:
+        engine = default_engine()
+
+    # Heap of (date ordinal, 0 for moondays or 1 for associated events, sequence number, event)
+    pending: List[Tuple[int, int, int, CalendarEvent]] = []
+    seq = 0
+
+    def _add(group: int, e: CalendarEvent):
+        nonlocal seq
+        if from_date <= e['date'] <= to_date:
+            heapq.heappush(pending, (e['date'].toordinal(), group, seq, e))
+            seq += 1
+
+    year = 0
+    year_type = YearType.Normal
+
+    # Start eight days early for the half moons of the uposathas before the range.
+    start_date = from_date - datetime.timedelta(days=HALF_MOON_DAYS)
+
+    for uposatha in iter_uposathas(start_date, to_date, engine):
+        # This and the later uposathas only add events from their own date.
+        x = uposatha.date.toordinal()
+        while len(pending) > 0 and pending[0][0] < x:
+            yield heapq.heappop(pending)[3]
+
+        if uposatha.date.year != year:
+            year = uposatha.date.year
+            year_type = engine.year_type(year)
+
+        _add(0, moonday_event(uposatha.date, uposatha, None, moon_phase_day_text))
+
+        if uposatha.phase == "new":
+            phase = "waxing"
+        else:
+            phase = "waning"
+        half_moon = HalfMoon(uposatha.date + datetime.timedelta(days=HALF_MOON_DAYS), phase)
+        _add(0, moonday_event(half_moon.date, None, half_moon, moon_phase_day_text))
+
+        for e in uposatha_associated_events(uposatha,
+                                            year_type,
+                                            assoc_events,
+                                            show_month_names,
+                                            show_adhikamasa_adhikavara):
+            _add(1, e)
+
+    while len(pending) > 0:
+        yield heapq.heappop(pending)[3]
+
+def iter_events(from_year: int,
+                to_year: int,
+                annual_events_csv_path: Optional[str] = None,
+                jobs: int = 1,
+                engine: Optional[CalendarEngine] = None,
+                ) -> Iterator[CalendarEvent]:
+    """
+    The moonday, associated and annual events from from_year to to_year
+    (inclusive) in date order, as exported by the year-events commands.
 
-    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            d = datetime.datetime.strptime(row['date'], "%Y-%m-%d")
-            e = CalendarEvent(
-                date = datetime.date(ce_year, d.month, d.day),
-                note = row['note'],
-                label = row['label'],
-                day_text = row['day_text'],
-                phase = row['phase'],
-                season = row['season'],
-                season_number = int(row['season_number']),
-                season_total = int(row['season_total']),
-                days = int(row['days']),
+    The events of iter_calendar_events() and the annual events, sorted within
+    each year, are merged as they are generated. On the same date the annual
+    events come after the others.
+
+    With jobs > 1 the years are split into contiguous blocks calculated in a
+    pool of processes, with a few blocks calculated ahead. Each block's events
+    are within its years, so the blocks are yielded in order and the result is
+    the same as with one job.
+    """
+
+    if engine is None:
+        engine = default_engine()
+
+    if jobs > 1 and to_year > from_year:
+        blocks = [(a, b, annual_events_csv_path, engine.ruleset) for a, b in year_blocks(from_year, to_year, jobs)]
+        yield from _iter_block_events(blocks, jobs)
+        return
+
+    events = iter_calendar_events(datetime.date(from_year, 1, 1),
+                                  datetime.date(to_year, 12, 31),
+                                  engine=engine)
+
+    if annual_events_csv_path is None:
+        yield from events
+        return
+
+    source = annual_events_source(annual_events_csv_path)
+
+    def _annual_events() -> Iterator[CalendarEvent]:
+        for year in range(from_year, to_year + 1):
+            yield from sorted(source.year_events(year), key=lambda x: x['date'])
+
+    # heapq.merge() takes equal dates from the earlier stream first.
+    yield from heapq.merge(events, _annual_events(), key=lambda x: x['date'])
+
+def collect_events(from_year: int,
+                   to_year: int,
+                   annual_events_csv_path: Optional[str] = None,
+                   jobs: int = 1,
+                   engine: Optional[CalendarEngine] = None,
+                   ) -> List[CalendarEvent]:
+    """The events of iter_events() as a list."""
+    return list(iter_events(from_year, to_year, annual_events_csv_path, jobs, engine))
+
+# Blocks per job, smaller blocks even out the work between the processes.
+YEAR_BLOCKS_PER_JOB = 4
+
+def year_blocks(from_year: int, to_year: int, jobs: int) -> List[Tuple[int, int]]:
+    """Split the years into contiguous (from_year, to_year) blocks of about the same size."""
+
+    n = to_year - from_year + 1
+    count = min(n, jobs * YEAR_BLOCKS_PER_JOB)
+
+    blocks: List[Tuple[int, int]] = []
+    start = from_year
+    for i in range(count):
+        size = n // count + (1 if i < n % count else 0)
+        blocks.append((start, start + size - 1))
+        start += size
+
+    return blocks
+
+def _iter_block_events(blocks: List[Tuple[int, int, Optional[str], Ruleset]], jobs: int) -> Iterator[CalendarEvent]:
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Keep two blocks per job running, so that the finished blocks don't
+        # pile up while the earlier ones are consumed.
+        pending: Deque[Future] = deque()
+        next_block = 0
+
+        while next_block < len(blocks) or len(pending) > 0:
+            while next_block < len(blocks) and len(pending) < jobs * 2:
+                pending.append(executor.submit(_collect_block_events, blocks[next_block]))
+                next_block += 1
+
+            yield from pending.popleft().result()
+
+def _collect_block_events(block: Tuple[int, int, Optional[str], Ruleset]) -> List[CalendarEvent]:
+    # Runs in a worker process, with the shared engine of the ruleset there.
+    from_year, to_year, annual_events_csv_path, ruleset = block
+    return collect_events(from_year, to_year, annual_events_csv_path, 1, engine_for(ruleset))
+
+class AnnualEventsSource:
+    """
+    The rows of an annual events CSV, parsed once into a template of month,
+    day and the other event fields, which is projected onto any years.
+
+    Only the month and the day of the date column are used. A row on Feb 29
+    only falls on leap years, the other years skip it.
+    """
+
+    csv_path: str
+    months:   array
+    days:     array
+    # note, label, day_text, phase, season, season_number, season_total, days
+    fields:   List[Tuple[str, str, str, str, str, int, int, int]]
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.months = array('b')
+        self.days = array('b')
+        self.fields = []
+
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                d = datetime.datetime.strptime(row['date'], "%Y-%m-%d")
+                self.months.append(d.month)
+                self.days.append(d.day)
+                self.fields.append((
+                    row['note'],
+                    row['label'],
+                    row['day_text'],
+                    row['phase'],
+                    row['season'],
+                    int(row['season_number']),
+                    int(row['season_total']),
+                    int(row['days']),
+                ))
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def year_events(self, ce_year: int) -> List[CalendarEvent]:
+        """The events in ce_year, in the order of the rows."""
+
+        events: List[CalendarEvent] = []
+        leap = calendar.isleap(ce_year)
+
+        for month, day, f in zip(self.months, self.days, self.fields):
+            if month == 2 and day == 29 and not leap:
+                continue
+
+            events.append(
+                CalendarEvent(
+                    date = datetime.date(ce_year, month, day),
+                    note = f[0],
+                    label = f[1],
+                    day_text = f[2],
+                    phase = f[3],
+                    season = f[4],
+                    season_number = f[5],
+                    season_total = f[6],
+                    days = f[7],
+                )
             )
-            events.append(e)
 
-    return events
+        return events
+
+    def events(self, years: Iterable[int]) -> List[CalendarEvent]:
+        """The events of each year, year by year."""
+
+        events: List[CalendarEvent] = []
+        for year in years:
+            events.extend(self.year_events(year))
+
+        return events
+
+# Parsed sources by path, with the (mtime, size) of the file when it was parsed
+_ANNUAL_EVENTS_SOURCES: Dict[str, Tuple[Tuple[int, int], AnnualEventsSource]] = {}
+_ANNUAL_EVENTS_SOURCES_LOCK = threading.Lock()
+
+def annual_events_source(csv_path: str) -> AnnualEventsSource:
+    """
+    The parsed annual events CSV. It is parsed again when the modification
+    time or the size of the file changes.
+    """
+
+    st = os.stat(csv_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(csv_path)
+
+    with _ANNUAL_EVENTS_SOURCES_LOCK:
+        cached = _ANNUAL_EVENTS_SOURCES.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    source = AnnualEventsSource(csv_path)
+
+    with _ANNUAL_EVENTS_SOURCES_LOCK:
+        _ANNUAL_EVENTS_SOURCES[key] = (stamp, source)
+
+    return source
+
+def parse_annual_events_csv(ce_year: int, csv_path: str) -> List[CalendarEvent]:
+    return annual_events_source(csv_path).year_events(ce_year)
+
+def write_events_csv(events: Iterable[CalendarEvent], csv_path: str, delimiter = ','):
+    """Write the events as CSV rows, one at a time, with the keys of the first event as the header."""
+
+    events = iter(events)
+    first = next(events, None)
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        if first is None:
+            fieldnames = list(CalendarEvent.__annotations__.keys())
+        else:
+            fieldnames = list(first.keys())
+
+        writer = csv.DictWriter(f,
+                                fieldnames=fieldnames,
+                                delimiter=delimiter)
+
+        writer.writeheader()
+        if first is not None:
+            writer.writerow(first)
+            for row in events:
+                writer.writerow(row)
+
+class JsonEvent(TypedDict):
+    date: str
+    day_text: str
+    note: str
+    label: str
+    phase: str
+    season: str
+    season_number: int
+    season_total: int
+    days: int
+
+def calendar_event_to_json(x: CalendarEvent) -> JsonEvent:
+    return JsonEvent(
+        date = x['date'].isoformat(),
+        day_text = x['day_text'],
+        note = x['note'],
+        label = x['label'],
+        phase = x['phase'],
+        season = x['season'],
+        season_number = x['season_number'],
+        season_total = x['season_total'],
+        days = x['days'],
+    )
+
+def write_events_json(events: Iterable[CalendarEvent], json_path: str):
+    """Write the events as a JSON list, encoding one event at a time."""
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i, e in enumerate(events):
+            if i > 0:
+                f.write(", ")
+            f.write(json.dumps(calendar_event_to_json(e)))
+        f.write("]")
@@ -1,3 +1,4 @@
+from typing import Dict
 import datetime
 
 from splendidmoons.ical import HasIcalEvent
@@ -10,6 +11,12 @@ class HalfMoon(HasIcalEvent):
         self.date = date
         self.phase = phase
 
+    def to_dict(self) -> Dict:
+        return {
+            "date": self.date.isoformat(),
+            "phase": self.phase,
+        }
+
     def __str__(self) -> str:
         if self.phase == "":
             return ""
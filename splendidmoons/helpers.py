@@ -1,4 +1,5 @@
-from typing import Tuple, Dict
+from array import array
+from typing import Iterable, Tuple, Dict
 from math import floor
 import datetime
 
@@ -40,28 +41,29 @@ def normalize_degree(deg: float) -> float:
 
     return deg - floor(deg/360)*360
 
-def horakhun_to_date(horakhun: int) -> datetime.date:
-    # Make sure it is not a pointer to HORAKHUN_REF_DATE, but is the same time.
-    y, m, d = HORAKHUN_REF_DATE_TUPLE
-    hor_date = datetime.date(y, m, d)
-
-    # Duration is max 290 solar years. Increment the date in 290 year steps.
+# The proleptic Gregorian ordinal of the HORAKHUN_REF date. The horakhun counts
+# days, so it is a constant offset from date.toordinal().
+HORAKHUN_REF_ORDINAL = datetime.date(*HORAKHUN_REF_DATE_TUPLE).toordinal()
 
-    delta = horakhun - HORAKHUN_REF
-    if delta == 0:
-        return hor_date
+def horakhun_to_date(horakhun: int) -> datetime.date:
+    return datetime.date.fromordinal(HORAKHUN_REF_ORDINAL + horakhun - HORAKHUN_REF)
 
-    step_days = 290 * 356
+def date_to_horakhun(date: datetime.date) -> int:
+    return HORAKHUN_REF + date.toordinal() - HORAKHUN_REF_ORDINAL
 
-    # How many times of step_days in delta?
-    times_step: int = floor(delta / step_days)
-    hor_date += datetime.timedelta(days=(times_step * step_days))
+def ordinals_to_horakhun(ordinals: Iterable[int]) -> array:
+    """Horakhun of each date ordinal (date.toordinal()), as an array."""
+    offset = HORAKHUN_REF - HORAKHUN_REF_ORDINAL
+    return array('q', (x + offset for x in ordinals))
 
-    # How much remaining days to add?
-    rem_delta: int = delta % step_days
-    hor_date += datetime.timedelta(days=rem_delta)
+def dates_to_horakhun(dates: Iterable[datetime.date]) -> array:
+    """Horakhun of each date, as an array."""
+    return ordinals_to_horakhun(x.toordinal() for x in dates)
 
-    return hor_date
+def horakhun_to_ordinals(horakhun: Iterable[int]) -> array:
+    """Date ordinal of each horakhun, as an array."""
+    offset = HORAKHUN_REF_ORDINAL - HORAKHUN_REF
+    return array('q', (x + offset for x in horakhun))
 
 SEASON_NAME: Dict[int, str] = {
     0: "",
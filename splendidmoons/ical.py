@@ -1,5 +1,5 @@
 import datetime
-from typing import TypedDict, List
+from typing import Iterable, TypedDict
 import uuid
 
 class IcalVEvent(TypedDict):
@@ -89,22 +89,23 @@ METHOD:PUBLISH
 """
 
 
-def write_ical(events: List[IcalVEvent],
+def write_ical(events: Iterable[IcalVEvent],
                ical_path: str,
                ical_prod_id = "Uposatha Moondays Mahānikāya EN",
                ical_url = "http://splendidmoons.github.io/ical/mahanikaya.ical",
                ical_name = "Uposatha Moondays (Mahānikāya)"):
 
-    text = MAHANIKAYA_ICAL_HEADER_TMPL.format(
+    header = MAHANIKAYA_ICAL_HEADER_TMPL.format(
         prod_id = ical_prod_id,
         url = ical_url,
         name = ical_name,
     )
 
-    for e in events:
-        text += ical_vevent_to_str(e)
+    # Write each event as it comes, the file buffers the writes.
+    with open(ical_path, 'w', encoding = 'utf-8', newline = '\r\n') as f:
+        f.write(header)
 
-    text += "END:VCALENDAR\n"
+        for e in events:
+            f.write(ical_vevent_to_str(e))
 
-    with open(ical_path, 'w', encoding = 'utf-8', newline = '\r\n') as f:
-        f.write(text)
+        f.write("END:VCALENDAR\n")
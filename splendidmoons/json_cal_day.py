@@ -1,46 +1,195 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableSequence, Sequence
+from functools import singledispatch
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar, Union, overload
 import datetime
-from typing import List, Optional, Dict
-from splendidmoons.calendar_consts import BE_DIFF
-from splendidmoons.calendar_year import CalendarYear
+import json
+from splendidmoons.engine import CalendarEngine, default_engine
 from splendidmoons.ical import HasIcalEvent
 
-from splendidmoons.uposatha_moon import UposathaMoon
+from splendidmoons.uposatha_moon import UposathaMoon, iter_uposathas, iter_uposathas_from, kattika_uposatha
 from splendidmoons.half_moon import HalfMoon
 from splendidmoons.astro_moon import AstroMoon
 from splendidmoons.event import Event, MajorEvent
 
+# The half moon is eight days after the uposatha.
+HALF_MOON_DAYS = 8
+
 class JsonCalDay():
     date: datetime.date = datetime.date.fromtimestamp(0)
     uposatha_moon: Optional[UposathaMoon] = None
     half_moon: Optional[HalfMoon] = None
     astro_moon: Optional[AstroMoon] = None
-    major_events: List[MajorEvent] = []
-    events: List[Event] = []
+    major_events: List[MajorEvent]
+    events: List[Event]
 
     def __init__(self):
-        pass
+        # Each day has its own lists
+        self.major_events = []
+        self.events = []
 
     def to_dict(self) -> Dict:
         return {
             "date": self.date.isoformat(),
-            "uposatha_moon": None if not self.uposatha_moon else self.uposatha_moon.__dict__,
-            "half_moon": self.half_moon,
-            "astro_moon": self.astro_moon,
-            "major_events": self.major_events,
-            "events": self.events,
+            "uposatha_moon": None if not self.uposatha_moon else self.uposatha_moon.to_dict(),
+            "half_moon": None if not self.half_moon else self.half_moon.to_dict(),
+            "astro_moon": None if not self.astro_moon else self.astro_moon.to_dict(),
+            "major_events": [e.to_dict() for e in self.major_events],
+            "events": [e.to_dict() for e in self.events],
         }
 
     def __str__(self) -> str:
         return str(self.to_dict())
 
-def find_json_cal_day_idx(cal_days: List[JsonCalDay],
+class CalDayIndex(MutableSequence[JsonCalDay]):
+    """
+    JsonCalDay objects keyed by date ordinal. Merging an event into its day is
+    a dict lookup. As a sequence it is the list of days in date order, with int
+    and slice indexing like the list which get_json_cal_days() used to return.
+
+    The days are always kept in date order, so append() and extend() put a
+    day at the position of its date, and a day can only be replaced with one
+    of the same date. insert(), reverse() and slice assignment raise TypeError.
+    A day must have its date set before it is added.
+    """
+
+    def __init__(self, days: Iterable[JsonCalDay] = ()):
+        # Days of each date ordinal, in the order they were added
+        self._days: Dict[int, List[JsonCalDay]] = {}
+        self._len = 0
+        # Days in date order and their date ordinals, rebuilt after a change
+        self._sorted: Optional[List[JsonCalDay]] = None
+        self._sorted_keys: Optional[List[int]] = None
+
+        self.extend(days)
+
+    def _changed(self):
+        self._sorted = None
+        self._sorted_keys = None
+
+    def _ordered(self) -> List[JsonCalDay]:
+        if self._sorted is None:
+            self._sorted = [d for k in sorted(self._days.keys()) for d in self._days[k]]
+        return self._sorted
+
+    def _ordered_keys(self) -> List[int]:
+        if self._sorted_keys is None:
+            self._sorted_keys = [d.date.toordinal() for d in self._ordered()]
+        return self._sorted_keys
+
+    def _add(self, day: JsonCalDay):
+        self._days.setdefault(day.date.toordinal(), []).append(day)
+        self._len += 1
+
+    def _remove(self, day: JsonCalDay):
+        x = day.date.toordinal()
+        bucket = self._days[x]
+        for i, d in enumerate(bucket):
+            if d is day:
+                del bucket[i]
+                break
+        if len(bucket) == 0:
+            del self._days[x]
+        self._len -= 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[JsonCalDay]:
+        return iter(self._ordered())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (CalDayIndex, list)):
+            return self._ordered() == list(other)
+        return NotImplemented
+
+    @overload
+    def __getitem__(self, key: int) -> JsonCalDay: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> List[JsonCalDay]: ...
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[JsonCalDay, List[JsonCalDay]]:
+        return self._ordered()[key]
+
+    @overload
+    def __setitem__(self, key: int, value: JsonCalDay) -> None: ...
+
+    @overload
+    def __setitem__(self, key: slice, value: Iterable[JsonCalDay]) -> None: ...
+
+    def __setitem__(self, key: Union[int, slice], value: Union[JsonCalDay, Iterable[JsonCalDay]]):
+        """Replace a day with a day of the same date, which keeps its position."""
+        if isinstance(key, slice) or not isinstance(value, JsonCalDay):
+            raise TypeError("CalDayIndex is ordered by date, slice assignment is not supported")
+
+        old = self._ordered()[key]
+        if old is value:
+            return
+
+        if old.date != value.date:
+            raise ValueError(f"Can only replace the day of {old.date} with a day of the same date, not {value.date}")
+
+        bucket = self._days[old.date.toordinal()]
+        bucket[next(i for i, d in enumerate(bucket) if d is old)] = value
+        self._changed()
+
+    def __delitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            removed = self._ordered()[key]
+        else:
+            removed = [self._ordered()[key]]
+
+        for d in removed:
+            self._remove(d)
+        self._changed()
+
+    def insert(self, index: int, value: JsonCalDay):
+        raise TypeError("CalDayIndex is ordered by date, use append() to add a day")
+
+    def append(self, value: JsonCalDay):
+        """Add the day at the position of its date, after the days with the same date."""
+        self._add(value)
+        self._changed()
+
+    def reverse(self):
+        raise TypeError("CalDayIndex is ordered by date and cannot be reversed")
+
+    def get(self, date: datetime.date) -> Optional[JsonCalDay]:
+        """The first day of the date."""
+        bucket = self._days.get(date.toordinal())
+        if bucket is None:
+            return None
+        return bucket[0]
+
+    def get_or_create(self, date: datetime.date) -> JsonCalDay:
+        day = self.get(date)
+        if day is None:
+            day = JsonCalDay()
+            day.date = date
+            self.append(day)
+        return day
+
+    def merge_event(self, event: HasIcalEvent) -> JsonCalDay:
+        """Add the event to the day of its date, creating the day if needed."""
+        return add_event_to_json_cal_day(event, self.get_or_create(event.date))
+
+    def range(self, from_date: datetime.date, to_date: datetime.date) -> List[JsonCalDay]:
+        """The days from from_date to to_date (inclusive)."""
+        keys = self._ordered_keys()
+        return self._ordered()[bisect_left(keys, from_date.toordinal()):bisect_right(keys, to_date.toordinal())]
+
+# A list of days or a CalDayIndex, the helpers below return the same type.
+CalDays = TypeVar("CalDays", bound=MutableSequence[JsonCalDay])
+
+def find_json_cal_day_idx(cal_days: Sequence[JsonCalDay],
                           date: datetime.date) -> Optional[int]:
     for idx, d in enumerate(cal_days):
         if d.date == date:
             return idx
     return None
 
-def add_half_moon_days(cal_days: List[JsonCalDay]) -> List[JsonCalDay]:
+def add_half_moon_days(cal_days: CalDays) -> CalDays:
     half_moon_days: List[JsonCalDay] = []
 
     for day in cal_days:
@@ -74,8 +223,12 @@ def add_half_moon_days(cal_days: List[JsonCalDay]) -> List[JsonCalDay]:
 
     return cal_days
 
-def merge_event_into_cal_days(cal_days: List[JsonCalDay],
-                              event: HasIcalEvent) -> List[JsonCalDay]:
+def merge_event_into_cal_days(cal_days: CalDays,
+                              event: HasIcalEvent) -> CalDays:
+    if isinstance(cal_days, CalDayIndex):
+        cal_days.merge_event(event)
+        return cal_days
+
     day_idx = find_json_cal_day_idx(cal_days, event.date)
     if day_idx is None:
         day = JsonCalDay()
@@ -91,140 +244,186 @@ def merge_event_into_cal_days(cal_days: List[JsonCalDay],
 
     return cal_days
 
-def get_json_cal_days(from_date: datetime.date,
-                      to_date: datetime.date) -> List[JsonCalDay]:
-    cal_days: List[JsonCalDay] = []
-
-    year = from_date.year
-    while year <= to_date.year:
-
-        for d in generate_solar_year(year):
-            if d.date < from_date or d.date > to_date:
-                continue
-            else:
-                merge_event_into_cal_days(cal_days, d)
-
-        year += 1
+def iter_json_cal_days(from_date: datetime.date,
+                       to_date: datetime.date,
+                       engine: Optional[CalendarEngine] = None) -> Iterator[JsonCalDay]:
+    """
+    The days with events from from_date to to_date, in date order. A day is
+    yielded as soon as no later uposatha can add events to it.
+    """
+
+    # Days with events, which may still get more
+    pending: Dict[int, JsonCalDay] = {}
+
+    # The events of an uposatha are on its date, the next day and the half
+    # moon eight days later, so start from the uposathas eight days before the
+    # range, and stop after the range.
+    start_date = from_date - datetime.timedelta(days=HALF_MOON_DAYS)
+
+    for uposatha in iter_uposathas(start_date, to_date, engine):
+        # This and the later uposathas only add events from their own date.
+        x = uposatha.date.toordinal()
+        for k in sorted(k for k in pending.keys() if k < x):
+            yield pending.pop(k)
+
+        for e in uposatha_events(uposatha):
+            if from_date <= e.date <= to_date:
+                k = e.date.toordinal()
+                day = pending.get(k)
+                if day is None:
+                    day = JsonCalDay()
+                    pending[k] = day
+                add_event_to_json_cal_day(e, day)
+
+    for k in sorted(pending.keys()):
+        yield pending[k]
 
-    return cal_days
-
-def generate_solar_year(ce_year: int) -> List[HasIcalEvent]:
-    events: List[HasIcalEvent] = []
-
-    cal_year = CalendarYear(ce_year)
+def get_json_cal_days(from_date: datetime.date,
+                      to_date: datetime.date,
+                      engine: Optional[CalendarEngine] = None) -> CalDayIndex:
+    return CalDayIndex(iter_json_cal_days(from_date, to_date, engine))
 
-    prev_kattika = cal_year.calculate_previous_kattika()
+def write_day_records_json(days: Iterable[JsonCalDay], json_path: str):
+    """Write the days as a JSON list, encoding one day at a time."""
 
-    lu = UposathaMoon()
-    lu.date =         prev_kattika
-    lu.phase =        "full"
-    lu.s_number =     8
-    lu.s_total =      8
-    lu.u_days =       15
-    lu.m_days =       29
-    lu.lunar_month =  12
-    lu.lunar_season = 3
-    lu.lunar_year =   prev_kattika.year + BE_DIFF
+    encoder = json.JSONEncoder()
 
-    last_uposatha = lu
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i, day in enumerate(days):
+            if i > 0:
+                f.write(", ")
+            f.writelines(encoder.iterencode(day.to_dict()))
+        f.write("]")
 
-    while last_uposatha.date.year <= ce_year:
-        uposatha: UposathaMoon = last_uposatha.next_uposatha()
-        last_uposatha = uposatha
+def write_day_records_jsonl(days: Iterable[JsonCalDay], jsonl_path: str):
+    """Write the days as JSON Lines, one day per line."""
 
-        # Add the Uposatha
-        if uposatha.date.year == ce_year:
-            events.append(uposatha)
+    encoder = json.JSONEncoder()
 
-        # Half Moon
-        phase = ""
-        if uposatha.phase == "new":
-            phase = "waxing"
-        elif uposatha.phase == "full":
-            phase = "waning"
-
-        half_moon = HalfMoon(
-            date = uposatha.date + datetime.timedelta(days=8),
-            phase = phase,
-        )
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for day in days:
+            f.writelines(encoder.iterencode(day.to_dict()))
+            f.write("\n")
 
-        if half_moon.date.year == ce_year:
-            events.append(half_moon)
-
-        # Major Events
+def generate_solar_year(ce_year: int, engine: Optional[CalendarEngine] = None) -> List[HasIcalEvent]:
+    events: List[HasIcalEvent] = []
 
-        if uposatha.date.year == ce_year:
+    if engine is None:
+        engine = default_engine()
 
-            if uposatha.event == "magha":
-                e = MajorEvent()
-                e.date = uposatha.date
-                e.summary = "Māgha Pūjā"
-                e.description = "Māgha Pūjā"
-                events.append(e)
+    # From the Kattika before the year, the half moons of the last uposathas
+    # in the previous year can fall into this year.
+    for uposatha in iter_uposathas_from(kattika_uposatha(ce_year, engine), engine):
+        if uposatha.date.year > ce_year:
+            break
 
-            elif uposatha.event == "vesakha":
-                e = MajorEvent()
-                e.date = uposatha.date
-                e.summary = "Vesākha Pūjā"
-                e.description = "Vesākha Pūjā"
+        for e in uposatha_events(uposatha):
+            if e.date.year == ce_year:
                 events.append(e)
 
-            elif uposatha.event == "asalha":
-                e = MajorEvent()
-                e.date = uposatha.date
-                e.summary = "Āsāḷha Pūjā"
-                e.description = "Āsāḷha Pūjā"
-                events.append(e)
+    return events
 
-                e = MajorEvent()
-                e.date = uposatha.date + datetime.timedelta(days=1)
-                e.summary = "First day of Vassa"
-                e.description = "First day of Vassa"
-                events.append(e)
+def uposatha_events(uposatha: UposathaMoon) -> List[HasIcalEvent]:
+    """The uposatha, its half moon and its major events."""
 
-            elif uposatha.event == "pavarana":
-                e = MajorEvent()
-                e.date = uposatha.date
-                e.summary = "Pavāraṇā Day"
-                e.description = "Pavāraṇā Day"
-                events.append(e)
+    events: List[HasIcalEvent] = []
 
-                e = MajorEvent()
-                e.date = uposatha.date
-                e.summary = "Last Day of Vassa"
-                e.description = "Last Day of Vassa"
-                events.append(e)
+    # Add the Uposatha
+    events.append(uposatha)
+
+    # Half Moon
+    phase = ""
+    if uposatha.phase == "new":
+        phase = "waxing"
+    elif uposatha.phase == "full":
+        phase = "waning"
+
+    half_moon = HalfMoon(
+        date = uposatha.date + datetime.timedelta(days=HALF_MOON_DAYS),
+        phase = phase,
+    )
+
+    events.append(half_moon)
+
+    # Major Events
+
+    if uposatha.event == "magha":
+        e = MajorEvent()
+        e.date = uposatha.date
+        e.summary = "Māgha Pūjā"
+        e.description = "Māgha Pūjā"
+        events.append(e)
+
+    elif uposatha.event == "vesakha":
+        e = MajorEvent()
+        e.date = uposatha.date
+        e.summary = "Vesākha Pūjā"
+        e.description = "Vesākha Pūjā"
+        events.append(e)
+
+    elif uposatha.event == "asalha":
+        e = MajorEvent()
+        e.date = uposatha.date
+        e.summary = "Āsāḷha Pūjā"
+        e.description = "Āsāḷha Pūjā"
+        events.append(e)
+
+        e = MajorEvent()
+        e.date = uposatha.date + datetime.timedelta(days=1)
+        e.summary = "First day of Vassa"
+        e.description = "First day of Vassa"
+        events.append(e)
+
+    elif uposatha.event == "pavarana":
+        e = MajorEvent()
+        e.date = uposatha.date
+        e.summary = "Pavāraṇā Day"
+        e.description = "Pavāraṇā Day"
+        events.append(e)
+
+        e = MajorEvent()
+        e.date = uposatha.date
+        e.summary = "Last Day of Vassa"
+        e.description = "Last Day of Vassa"
+        events.append(e)
 
     return events
 
+@singledispatch
 def add_event_to_json_cal_day(event: HasIcalEvent, day: JsonCalDay) -> JsonCalDay:
-    type_self = str(type(event))
+    """
+    Add the event to the day, by the type of the event.
+
+    Other event classes can be added with
+    add_event_to_json_cal_day.register(cls, handler), where the handler takes
+    the same arguments. Subclasses use the handler of their closest registered
+    base class, e.g. subclasses of Event are added to the day's events.
+    """
+    raise Exception(f"add_event_to_json_cal_day() can't handle type: {type(event)}")
 
+@add_event_to_json_cal_day.register(UposathaMoon)
+def _add_uposatha_moon(event: UposathaMoon, day: JsonCalDay) -> JsonCalDay:
     day.date = event.date
+    day.uposatha_moon = event
+    return day
 
-    if type_self == "<class 'splendidmoons.uposatha_moon.UposathaMoon'>" \
-       and isinstance(event, UposathaMoon):
-        day.uposatha_moon = event
-        return day
-
-    elif type_self == "<class 'splendidmoons.half_moon.HalfMoon'>" \
-       and isinstance(event, HalfMoon):
-        day.half_moon = event
-        return day
-
-    elif type_self == "<class 'splendidmoons.astro_moon.AstroMoon'>" \
-       and isinstance(event, AstroMoon):
-        day.astro_moon = event
-        return day
-
-    elif type_self == "<class 'splendidmoons.event.MajorEvent'>" \
-       and isinstance(event, MajorEvent):
-        day.major_events.append(event)
-        return day
+@add_event_to_json_cal_day.register(HalfMoon)
+def _add_half_moon(event: HalfMoon, day: JsonCalDay) -> JsonCalDay:
+    day.date = event.date
+    day.half_moon = event
+    return day
 
-    elif type_self == "<class 'splendidmoons.event.Event'>" \
-       and isinstance(event, Event):
-        day.events.append(event)
-        return day
+@add_event_to_json_cal_day.register(AstroMoon)
+def _add_astro_moon(event: AstroMoon, day: JsonCalDay) -> JsonCalDay:
+    day.date = event.date
+    day.astro_moon = event
+    return day
 
-    raise Exception(f"add_event_to_json_cal_day() can't handle type: {type(event)}")
+# MajorEvent is the same class as Event, so major events are added to the
+# day's events too.
+@add_event_to_json_cal_day.register(Event)
+def _add_event(event: Event, day: JsonCalDay) -> JsonCalDay:
+    day.date = event.date
+    day.events.append(event)
+    return day
@@ -0,0 +1,260 @@
+"""
+The lunar mansion (raek) of each day over a range of days, saved to and
+memory-mapped from an index file.
+"""
+
+from array import array
+from bisect import bisect_left
+from math import floor
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import datetime
+import mmap
+import struct
+import sys
+
+from splendidmoons.helpers import date_to_horakhun, horakhun_to_date
+from splendidmoons.suriya_array import calendar_days_range
+
+RAEK_COUNT = 27
+
+RAEK_INDEX_MAGIC = b"SMRAEK"
+
+# Increment when the layout of the file changes.
+RAEK_INDEX_FORMAT = 2
+
+# magic, format, horakhun of the first day, number of days, number of transitions
+RAEK_INDEX_HEADER = struct.Struct("<6sHqqq")
+
+# The file layout after the header:
+#
+# - mansions:    one byte per day, padded to a multiple of 4 bytes
+# - starts:      RAEK_COUNT + 2 uint32, positions[starts[n]:starts[n+1]] are the days in mansion n
+# - positions:   one uint32 day offset per day, grouped by mansion
+# - transitions: uint32 day offsets
+#
+# The uint32 values are little-endian.
+
+DateOrHorakhun = Union[datetime.date, int]
+
+# Offset arrays, an array('I') or a memoryview of the mapped file cast to 'I'
+Offsets = Union[array, memoryview]
+
+def raek_mansion(raek: float) -> int:
+    """The mansion number 1-27 of a CalendarDay.raek value."""
+    return (int(floor(raek)) - 1) % RAEK_COUNT + 1
+
+def _horakhun(day: DateOrHorakhun) -> int:
+    if isinstance(day, datetime.date):
+        return date_to_horakhun(day)
+    return day
+
+def _padding(size: int) -> int:
+    return (4 - size % 4) % 4
+
+class RaekIndex:
+    """
+    Mansion numbers for consecutive days from start_horakhun. The query
+    methods take a date or a horakhun, the ranges include both ends.
+    """
+
+    start_horakhun: int
+    mansions:       Union[array, memoryview]
+
+    _mmap:          Optional[mmap.mmap]
+    _closed:        bool
+    # The memoryviews of the mapped file, released in close()
+    _views:         List[memoryview]
+    _starts:        Optional[Offsets]
+    _positions:     Optional[Offsets]
+    # Offsets of the days where the mansion differs from the day before.
+    _transitions:   Optional[Offsets]
+
+    def __init__(self, start_horakhun: int, mansions: Union[array, memoryview]):
+        self.start_horakhun = start_horakhun
+        self.mansions = mansions
+        self._mmap = None
+        self._closed = False
+        self._views = []
+        self._starts = None
+        self._positions = None
+        self._transitions = None
+
+    @classmethod
+    def build(cls, from_year: int, to_year: int) -> "RaekIndex":
+        """The index of every lunar year day from from_year to to_year (inclusive)."""
+
+        days = calendar_days_range(from_year, to_year)
+        mansions = array('B', (raek_mansion(r) for r in days.raek))
+
+        return cls(days.horakhun[0], mansions)
+
+    @classmethod
+    def load(cls, path: Path) -> "RaekIndex":
+        """Memory-map an index written with save()."""
+
+        with open(path, 'rb') as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, start_horakhun, count, transitions_count = (b"", 0, 0, 0, 0)
+        if len(m) >= RAEK_INDEX_HEADER.size:
+            magic, fmt, start_horakhun, count, transitions_count = RAEK_INDEX_HEADER.unpack_from(m, 0)
+
+        if magic != RAEK_INDEX_MAGIC or fmt != RAEK_INDEX_FORMAT:
+            m.close()
+            raise ValueError(f"Not a raek index file (format {RAEK_INDEX_FORMAT}): {path}")
+
+        view = memoryview(m)
+        index = cls(start_horakhun, view)
+        index._mmap = m
+        index._views.append(view)
+
+        def _slice(start: int, size: int) -> memoryview:
+            v = view[start:start + size]
+            index._views.append(v)
+            return v
+
+        def _offsets(start: int, n: int) -> Offsets:
+            v = _slice(start, 4 * n)
+            if sys.byteorder == 'little':
+                c = v.cast('I')
+                index._views.append(c)
+                return c
+            a = array('I', bytes(v))
+            a.byteswap()
+            return a
+
+        pos = RAEK_INDEX_HEADER.size
+        index.mansions = _slice(pos, count)
+        pos += count + _padding(count)
+
+        index._starts = _offsets(pos, RAEK_COUNT + 2)
+        pos += 4 * (RAEK_COUNT + 2)
+
+        index._positions = _offsets(pos, count)
+        pos += 4 * count
+
+        index._transitions = _offsets(pos, transitions_count)
+
+        return index
+
+    def save(self, path: Path):
+        self._check_open()
+        starts, positions, transitions = self._offsets()
+
+        with open(path, 'wb') as f:
+            f.write(RAEK_INDEX_HEADER.pack(RAEK_INDEX_MAGIC, RAEK_INDEX_FORMAT,
+                                           self.start_horakhun, len(self), len(transitions)))
+            f.write(bytes(self.mansions))
+            f.write(b"\0" * _padding(len(self)))
+
+            for a in [starts, positions, transitions]:
+                a = array('I', a)
+                if sys.byteorder != 'little':
+                    a.byteswap()
+                f.write(a.tobytes())
+
+    def close(self):
+        """
+        Release the memory-mapped file of an index from load(). The index
+        can't be used after this.
+        """
+        if self._mmap is not None:
+            self.mansions = array('B')
+            self._closed = True
+            self._starts = None
+            self._positions = None
+            self._transitions = None
+            # The derived views first, then the view of the whole file
+            for v in reversed(self._views):
+                v.release()
+            self._views = []
+            self._mmap.close()
+            self._mmap = None
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError("The raek index is closed")
+
+    def __len__(self) -> int:
+        self._check_open()
+        return len(self.mansions)
+
+    @property
+    def end_horakhun(self) -> int:
+        """Horakhun of the last day."""
+        return self.start_horakhun + len(self) - 1
+
+    def covers(self, day: DateOrHorakhun) -> bool:
+        return self.start_horakhun <= _horakhun(day) <= self.end_horakhun
+
+    def _offset(self, day: DateOrHorakhun) -> int:
+        h = _horakhun(day)
+        if not self.start_horakhun <= h <= self.end_horakhun:
+            raise IndexError(f"Horakhun {h} is outside {self.start_horakhun}-{self.end_horakhun}")
+
+        return h - self.start_horakhun
+
+    def _range(self, start: DateOrHorakhun, end: DateOrHorakhun) -> Tuple[int, int]:
+        """Offsets from start up to and not including the day after end."""
+        return (self._offset(start), self._offset(end) + 1)
+
+    def _offsets(self) -> Tuple[Offsets, Offsets, Offsets]:
+        """The starts, positions and transitions, calculated if not yet known."""
+        self._check_open()
+
+        if self._starts is None or self._positions is None or self._transitions is None:
+            by_mansion = [array('I') for _ in range(RAEK_COUNT + 1)]
+            transitions = array('I')
+
+            prev = 0
+            for i, n in enumerate(self.mansions):
+                by_mansion[n].append(i)
+                if n != prev:
+                    transitions.append(i)
+                    prev = n
+
+            starts = array('I', [0])
+            positions = array('I')
+            for a in by_mansion:
+                positions.extend(a)
+                starts.append(len(positions))
+
+            self._starts = starts
+            self._positions = positions
+            self._transitions = transitions
+
+        return (self._starts, self._positions, self._transitions)
+
+    def mansion(self, day: DateOrHorakhun) -> int:
+        """The mansion number of a day."""
+        return self.mansions[self._offset(day)]
+
+    def days_in_raek(self, n: int, start: DateOrHorakhun, end: DateOrHorakhun) -> List[datetime.date]:
+        """The days from start to end when the True Moon is in mansion n."""
+
+        if not 1 <= n <= RAEK_COUNT:
+            raise ValueError(f"Mansion number must be 1-{RAEK_COUNT}: {n}")
+
+        a, b = self._range(start, end)
+        starts, pos, _ = self._offsets()
+
+        lo = bisect_left(pos, a, starts[n], starts[n+1])
+        hi = bisect_left(pos, b, lo, starts[n+1])
+
+        return [horakhun_to_date(self.start_horakhun + pos[i]) for i in range(lo, hi)]
+
+    def raek_transitions(self, start: DateOrHorakhun, end: DateOrHorakhun) -> List[Tuple[datetime.date, int]]:
+        """
+        The days from start to end when the mansion differs from the day
+        before, with the new mansion number. The first day of the index counts
+        as a transition.
+        """
+
+        a, b = self._range(start, end)
+        _, _, tr = self._offsets()
+
+        lo = bisect_left(tr, a)
+        hi = bisect_left(tr, b, lo)
+
+        return [(horakhun_to_date(self.start_horakhun + tr[i]), self.mansions[tr[i]]) for i in range(lo, hi)]
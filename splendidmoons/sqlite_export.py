@@ -0,0 +1,222 @@
+"""
+Export of the years and the calendar events to SQLite.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import datetime
+import sqlite3
+
+from splendidmoons.calendar_consts import BE_DIFF, CS_DIFF
+from splendidmoons.calendar_year import YEAR_TYPE_NAME, classify_years_with_values
+from splendidmoons.engine import CalendarEngine, default_engine
+from splendidmoons.event_helpers import CalendarEvent, iter_events
+
+# The year types, labels, phases and seasons are in lookup tables, which the
+# years and the events refer to by id.
+SQLITE_SCHEMA = [
+    "DROP TABLE IF EXISTS events",
+    "DROP TABLE IF EXISTS years",
+    "DROP TABLE IF EXISTS year_types",
+    "DROP TABLE IF EXISTS labels",
+    "DROP TABLE IF EXISTS phases",
+    "DROP TABLE IF EXISTS seasons",
+    """CREATE TABLE year_types (
+        id   INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE labels (
+        id   INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE phases (
+        id   INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE seasons (
+        id   INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE years (
+        year           INTEGER PRIMARY KEY,
+        be_year        INTEGER NOT NULL,
+        cs_year        INTEGER NOT NULL,
+        year_type      INTEGER NOT NULL REFERENCES year_types (id),
+        year_length    INTEGER NOT NULL,
+        kattika_date   TEXT NOT NULL,
+        asalha_puja    TEXT NOT NULL,
+        horakhun       INTEGER NOT NULL,
+        kammacubala    INTEGER NOT NULL,
+        uccabala       INTEGER NOT NULL,
+        avoman         INTEGER NOT NULL,
+        masaken        INTEGER NOT NULL,
+        tithi          INTEGER NOT NULL
+    )""",
+    """CREATE TABLE events (
+        id            INTEGER PRIMARY KEY,
+        year          INTEGER NOT NULL REFERENCES years (year),
+        date          TEXT NOT NULL,
+        day_text      TEXT NOT NULL,
+        note          TEXT NOT NULL,
+        label_id      INTEGER NOT NULL REFERENCES labels (id),
+        phase_id      INTEGER NOT NULL REFERENCES phases (id),
+        season_id     INTEGER NOT NULL REFERENCES seasons (id),
+        season_number INTEGER NOT NULL,
+        season_total  INTEGER NOT NULL,
+        days          INTEGER NOT NULL
+    )""",
+    "CREATE INDEX events_date ON events (date)",
+    "CREATE INDEX events_label ON events (label_id)",
+    "CREATE INDEX events_phase ON events (phase_id)",
+    "CREATE INDEX events_season ON events (season_id)",
+]
+
+# The CalendarEvent values of each event, in the order of the CalendarEvent keys
+EVENTS_SELECT = """SELECT e.date, e.day_text, e.note, l.name, p.name, s.name, e.season_number, e.season_total, e.days
+    FROM events e
+    JOIN labels l ON l.id = e.label_id
+    JOIN phases p ON p.id = e.phase_id
+    JOIN seasons s ON s.id = e.season_id"""
+
+def _year_rows(from_year: int, to_year: int, engine: CalendarEngine) -> Iterator[Tuple]:
+    for c, (horakhun, kammacubala, uccabala, avoman, masaken, tithi) in classify_years_with_values(from_year, to_year, engine):
+        yield (
+            c.year,
+            c.year + BE_DIFF,
+            c.year - CS_DIFF,
+            int(c.year_type),
+            c.year_length,
+            c.kattika_date.isoformat(),
+            c.asalha_puja.isoformat(),
+            horakhun,
+            kammacubala,
+            uccabala,
+            avoman,
+            masaken,
+            tithi,
+        )
+
+def _event_rows(conn: sqlite3.Connection, events: Iterator[CalendarEvent]) -> Iterator[Tuple]:
+    # Ids of the names in each lookup table, inserted when first seen
+    ids: Dict[str, Dict[str, int]] = {"labels": {}, "phases": {}, "seasons": {}}
+
+    def _id(table: str, name: str) -> int:
+        x = ids[table].get(name)
+        if x is None:
+            x = conn.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,)).lastrowid
+            assert x is not None
+            ids[table][name] = x
+        return x
+
+    for e in events:
+        yield (
+            e['date'].year,
+            e['date'].isoformat(),
+            e['day_text'],
+            e['note'],
+            _id("labels", e['label']),
+            _id("phases", e['phase']),
+            _id("seasons", e['season']),
+            e['season_number'],
+            e['season_total'],
+            e['days'],
+        )
+
+def write_events_sqlite(db_path: str,
+                        from_year: int,
+                        to_year: int,
+                        annual_events_csv_path: Optional[str] = None,
+                        jobs: int = 1,
+                        engine: Optional[CalendarEngine] = None):
+    """
+    Write the years and the events from from_year to to_year (inclusive) to
+    the database, replacing the tables if they exist, in one transaction.
+    """
+
+    if engine is None:
+        engine = default_engine()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+
+        for statement in SQLITE_SCHEMA:
+            conn.execute(statement)
+
+        conn.executemany("INSERT INTO year_types (id, name) VALUES (?, ?)",
+                         [(int(t), name) for t, name in YEAR_TYPE_NAME.items()])
+
+        conn.executemany("INSERT INTO years VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         _year_rows(from_year, to_year, engine))
+
+        events = iter_events(from_year, to_year, annual_events_csv_path, jobs, engine)
+        conn.executemany("""INSERT INTO events (year, date, day_text, note, label_id, phase_id, season_id,
+                                                season_number, season_total, days)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                         _event_rows(conn, events))
+
+        conn.execute("COMMIT")
+
+    except BaseException:
+        # Nothing to roll back if BEGIN failed, keep the original error
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+    finally:
+        conn.close()
+
+def query_events(db_path: str,
+                 from_date: Optional[datetime.date] = None,
+                 to_date: Optional[datetime.date] = None,
+                 label: Optional[str] = None,
+                 phase: Optional[str] = None,
+                 season: Optional[str] = None) -> List[CalendarEvent]:
+    """
+    The events from from_date to to_date (inclusive) in the database, with
+    the label, phase and season if given, in the order they were written.
+    """
+
+    where: List[str] = []
+    params: List[str] = []
+
+    if from_date is not None:
+        where.append("e.date >= ?")
+        params.append(from_date.isoformat())
+    if to_date is not None:
+        where.append("e.date <= ?")
+        params.append(to_date.isoformat())
+    if label is not None:
+        where.append("l.name = ?")
+        params.append(label)
+    if phase is not None:
+        where.append("p.name = ?")
+        params.append(phase)
+    if season is not None:
+        where.append("s.name = ?")
+        params.append(season)
+
+    sql = EVENTS_SELECT
+    if len(where) > 0:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY e.date, e.id"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    return [
+        CalendarEvent(
+            date = datetime.date.fromisoformat(r[0]),
+            day_text = r[1],
+            note = r[2],
+            label = r[3],
+            phase = r[4],
+            season = r[5],
+            season_number = r[6],
+            season_total = r[7],
+            days = r[8],
+        )
+        for r in rows
+    ]
@@ -0,0 +1,251 @@
+"""
+Year and day values over a range of years, one typed array per value.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from splendidmoons.calendar_consts import BE_DIFF, CS_DIFF
+from splendidmoons.calendar_day import (horakhun_to_lunar_year_day, mean_moon, mean_sun, raek, suriya_day_values, true_moon,
+                                        true_sun)
+from splendidmoons.helpers import ordinals_to_horakhun
+from splendidmoons.calendar_year import YEAR_LENGTH_DAYS, YearType, classify_adhikavara, suriya_year_values, would_be_adhikamasa, would_be_adhikavara
+from splendidmoons.engine import CalendarEngine, default_engine
+
+SURIYA_VALUE_NAMES = ["year", "be_year", "cs_year", "horakhun", "kammacubala",
+                      "uccabala", "avoman", "masaken", "tithi"]
+
+def suriya_values(years: Iterable[int]) -> Dict[str, array]:
+    """
+    The values of CalendarYear for each year, as a dict of arrays keyed by the
+    attribute names in SURIYA_VALUE_NAMES.
+    """
+
+    values: Dict[str, array] = {k: array('q') for k in SURIYA_VALUE_NAMES}
+
+    for year in years:
+        cs_year = year - CS_DIFF
+        horakhun, kammacubala, uccabala, avoman, masaken, tithi = suriya_year_values(cs_year)
+
+        values['year'].append(year)
+        values['be_year'].append(year + BE_DIFF)
+        values['cs_year'].append(cs_year)
+        values['horakhun'].append(horakhun)
+        values['kammacubala'].append(kammacubala)
+        values['uccabala'].append(uccabala)
+        values['avoman'].append(avoman)
+        values['masaken'].append(masaken)
+        values['tithi'].append(tithi)
+
+    return values
+
+class CalendarYearArray:
+    """
+    Year values and classification for the years from_year to to_year
+    (inclusive), with the same meaning as the CalendarYear attributes and
+    methods of the same name, classified with the ruleset of the engine (or
+    the default engine).
+    """
+
+    from_year:           int
+    to_year:             int
+    year:                array
+    be_year:             array
+    cs_year:             array
+    horakhun:            array
+    kammacubala:         array
+    uccabala:            array
+    avoman:              array
+    masaken:             array
+    tithi:               array
+    would_be_adhikamasa: array
+    is_adhikamasa:       array
+    would_be_adhikavara: array
+    is_adhikavara:       array
+    year_type:           array
+    year_length:         array
+
+    def __init__(self, from_year: int, to_year: int, engine: Optional[CalendarEngine] = None):
+        self.from_year = from_year
+        self.to_year = to_year
+
+        if engine is None:
+            engine = default_engine()
+        exceptions = engine.ruleset.adhikavara_exceptions
+
+        # Calculate one year on each side, the classification looks at the
+        # previous and the next year.
+        values = suriya_values(range(from_year - 1, to_year + 2))
+
+        tithi = values['tithi']
+        kammacubala = values['kammacubala']
+        avoman = values['avoman']
+
+        wb_masa = [would_be_adhikamasa(t) for t in tithi]
+        wb_vara = [would_be_adhikavara(k, av) for k, av in zip(kammacubala, avoman)]
+
+        # If next year also qualifies for adhikamāsa, then this year isn't
+        is_masa = [wb_masa[i] and not wb_masa[i+1] for i in range(len(wb_masa) - 1)]
+
+        n = to_year - from_year + 1
+
+        self.is_adhikamasa = array('b', is_masa[1:])
+        self.would_be_adhikamasa = array('b', wb_masa[1:n+1])
+        self.would_be_adhikavara = array('b', wb_vara[1:n+1])
+        self.is_adhikavara = array('b')
+        self.year_type = array('b')
+        self.year_length = array('h')
+
+        for i in range(n):
+            # Index of the year in the values with the neighbours
+            k = i + 1
+            year = from_year + i
+
+            is_vara = classify_adhikavara(year, is_masa[k], is_masa[k-1], wb_vara[k-1], wb_vara[k], exceptions)
+
+            self.is_adhikavara.append(is_vara)
+
+            if is_masa[k]:
+                year_type = YearType.Adhikamasa
+            elif is_vara:
+                year_type = YearType.Adhikavara
+            else:
+                year_type = YearType.Normal
+
+            self.year_type.append(year_type)
+            self.year_length.append(YEAR_LENGTH_DAYS[year_type])
+
+        for name in SURIYA_VALUE_NAMES:
+            setattr(self, name, values[name][1:n+1])
+
+    def __len__(self) -> int:
+        return self.to_year - self.from_year + 1
+
+    def index(self, ce_year: int) -> int:
+        if ce_year < self.from_year or ce_year > self.to_year:
+            raise IndexError(f"Year {ce_year} is outside {self.from_year}-{self.to_year}")
+
+        return ce_year - self.from_year
+
+CALENDAR_DAY_VALUE_NAMES = ["year", "day", "horakhun", "kammacubala", "uccabala", "avoman", "masaken", "tithi",
+                            "mean_sun", "true_sun", "mean_moon", "true_moon", "raek"]
+
+class CalendarDayArray:
+    """
+    CalendarDay values for a number of days, with the same meaning as the
+    CalendarDay attributes of the same name. The positions are in degrees,
+    floored to four decimal places the same way.
+    """
+
+    year:        array
+    day:         array
+    horakhun:    array
+    kammacubala: array
+    uccabala:    array
+    avoman:      array
+    masaken:     array
+    tithi:       array
+    mean_sun:    array
+    true_sun:    array
+    mean_moon:   array
+    true_moon:   array
+    raek:        array
+
+    def __init__(self):
+        for name in CALENDAR_DAY_VALUE_NAMES[:8]:
+            setattr(self, name, array('q'))
+        for name in CALENDAR_DAY_VALUE_NAMES[8:]:
+            setattr(self, name, array('d'))
+
+    def __len__(self) -> int:
+        return len(self.horakhun)
+
+    def extend_year(self, ce_year: int, days: Iterable[int]):
+        """Append the given lunar year days of ce_year."""
+
+        cs_year = ce_year - CS_DIFF
+        (year_horakhun, year_kammacubala, year_uccabala, _, _, year_tithi) = suriya_year_values(cs_year)
+
+        for day in days:
+            elapsed_days = day - year_tithi
+
+            (horakhun, kammacubala, uccabala, avoman, masaken, tithi) = \
+                suriya_day_values(cs_year, year_horakhun, elapsed_days)
+
+            d_mean_sun = mean_sun(elapsed_days, year_kammacubala)
+            d_true_sun = true_sun(d_mean_sun)
+            d_mean_moon = mean_moon(d_true_sun, avoman, tithi)
+            d_true_moon = true_moon(d_mean_moon, year_uccabala, elapsed_days)
+
+            self.year.append(ce_year)
+            self.day.append(day)
+            self.horakhun.append(horakhun)
+            self.kammacubala.append(kammacubala)
+            self.uccabala.append(uccabala)
+            self.avoman.append(avoman)
+            self.masaken.append(masaken)
+            self.tithi.append(tithi)
+            self.mean_sun.append(d_mean_sun)
+            self.true_sun.append(d_true_sun)
+            self.mean_moon.append(d_mean_moon)
+            self.true_moon.append(d_true_moon)
+            self.raek.append(raek(d_true_moon))
+
+def lunar_year_days(ce_year: int) -> range:
+    """
+    The lunar year days of ce_year, from day 0 (horakhun minus tithi at the
+    New Year) to the day before day 0 of the next year. This is 354, 355, 384
+    or 385 days, and consecutive years cover each horakhun once.
+    """
+
+    (horakhun, _, _, _, _, tithi) = suriya_year_values(ce_year - CS_DIFF)
+    (next_horakhun, _, _, _, _, next_tithi) = suriya_year_values(ce_year + 1 - CS_DIFF)
+
+    return range(0, (next_horakhun - next_tithi) - (horakhun - tithi))
+
+def calendar_days(ce_year: int, days: Optional[Iterable[int]] = None) -> CalendarDayArray:
+    """CalendarDay values of the given days of ce_year, or all of its lunar_year_days()."""
+
+    if days is None:
+        days = lunar_year_days(ce_year)
+
+    values = CalendarDayArray()
+    values.extend_year(ce_year, days)
+
+    return values
+
+def calendar_days_range(from_year: int, to_year: int) -> CalendarDayArray:
+    """CalendarDay values of every lunar year day from from_year to to_year (inclusive)."""
+
+    values = CalendarDayArray()
+    for year in range(from_year, to_year + 1):
+        values.extend_year(year, lunar_year_days(year))
+
+    return values
+
+def calendar_days_for_horakhun(horakhun: Iterable[int]) -> CalendarDayArray:
+    """CalendarDay values of each horakhun, in the given order."""
+
+    values = CalendarDayArray()
+
+    # Collect the consecutive days of the same year, to calculate the year values once.
+    year = 0
+    days: List[int] = []
+
+    for h in horakhun:
+        ce_year, day = horakhun_to_lunar_year_day(h)
+        if ce_year != year and len(days) > 0:
+            values.extend_year(year, days)
+            days = []
+
+        year = ce_year
+        days.append(day)
+
+    if len(days) > 0:
+        values.extend_year(year, days)
+
+    return values
+
+def calendar_days_for_ordinals(ordinals: Iterable[int]) -> CalendarDayArray:
+    """CalendarDay values of each date ordinal (date.toordinal()), in the given order."""
+    return calendar_days_for_horakhun(ordinals_to_horakhun(ordinals))
@@ -1,7 +1,13 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Dict, Tuple
 import datetime
-from typing import Self, Dict
-from splendidmoons.calendar_year import CalendarYear
+import threading
+from splendidmoons.engine import CalendarEngine, default_engine
 
+from splendidmoons.calendar_consts import BE_DIFF
+from splendidmoons.calendar_year import YEAR_CACHE_MAXSIZE, YearType
 from splendidmoons.helpers import SEASON_NAME
 from splendidmoons.ical import HasIcalEvent
 
@@ -40,129 +46,391 @@ class UposathaMoon(HasIcalEvent):
     def __init__(self):
         pass
 
-    def next_uposatha(self) -> Self:
-        lu = self # last uposatha
-        nu = UposathaMoon() # next uposatha
+    def to_dict(self) -> Dict:
+        return {
+            "date": self.date.isoformat(),
+            "phase": self.phase,
+            "event": self.event,
+            "s_number": self.s_number,
+            "s_total": self.s_total,
+            "u_days": self.u_days,
+            "m_days": self.m_days,
+            "lunar_month": self.lunar_month,
+            "lunar_season": self.lunar_season,
+            "lunar_year": self.lunar_year,
+            "has_adhikavara": self.has_adhikavara,
+            "source": self.source,
+            "comments": self.comments,
+        }
 
-        cal_year = CalendarYear(lu.date.year)
+    def next_uposatha(self, engine: Optional[CalendarEngine] = None) -> "UposathaMoon":
+        if engine is None:
+            engine = default_engine()
 
-        is_adhikamasa_year = cal_year.is_adhikamasa()
-        is_adhikavara_year = cal_year.is_adhikavara()
+        cal_year = engine.calendar_year(self.date.year)
 
-        # Alternating New Moon and Full Moon uposathas.
+        return step_uposatha(self, cal_year.is_adhikamasa(), cal_year.is_adhikavara())
 
-        if lu.phase == "new":
-            nu.phase = "full"
-        else:
-            nu.phase = "new"
+    def __str__(self) -> str:
+        if self.phase == "":
+            return ""
 
-        if nu.phase == "full":
+        return "{} Moon - {} day {} {}/{}".format(self.phase.title(),
+                                                  self.u_days,
+                                                  SEASON_NAME[self.lunar_season],
+                                                  self.s_number,
+                                                  self.s_total)
 
-            # A Full Moon uposatha is always 15 days in the same month, season and year as the last uposatha.
+def step_uposatha(lu: UposathaMoon, is_adhikamasa_year: bool, is_adhikavara_year: bool) -> UposathaMoon:
+    """
+    The uposatha after lu (the last uposatha), with the adhikamāsa and
+    adhikavāra flags of the solar year of lu.date.
+    """
 
-            nu.s_number = lu.s_number + 1
-            nu.s_total = lu.s_total
-            nu.u_days = 15
-            nu.m_days = lu.m_days
-            nu.lunar_month = lu.lunar_month
-            nu.lunar_season = lu.lunar_season
-            nu.lunar_year = lu.lunar_year
-            nu.has_adhikavara = False # Adhikavara is only added to New Moons
-
-            # Event: magha, vesakha, asalha, pavarana
-
-            # In Adhikamāsa Years the major moons shift with one month
-            if is_adhikamasa_year:
-                if nu.lunar_month == 4:
-                    nu.event = "magha"
-                elif nu.lunar_month == 7:
-                    nu.event = "vesakha"
-                elif nu.lunar_month == 13:
-                    nu.event = "asalha"
-                elif nu.lunar_month == 11:
-                    nu.event = "pavarana"
-                else:
-                    nu.event = ""
+    nu = UposathaMoon() # next uposatha
+
+    # Alternating New Moon and Full Moon uposathas.
+
+    if lu.phase == "new":
+        nu.phase = "full"
+    else:
+        nu.phase = "new"
+
+    if nu.phase == "full":
+
+        # A Full Moon uposatha is always 15 days in the same month, season and year as the last uposatha.
+
+        nu.s_number = lu.s_number + 1
+        nu.s_total = lu.s_total
+        nu.u_days = 15
+        nu.m_days = lu.m_days
+        nu.lunar_month = lu.lunar_month
+        nu.lunar_season = lu.lunar_season
+        nu.lunar_year = lu.lunar_year
+        nu.has_adhikavara = False # Adhikavara is only added to New Moons
 
+        # Event: magha, vesakha, asalha, pavarana
+
+        # In Adhikamāsa Years the major moons shift with one month
+        if is_adhikamasa_year:
+            if nu.lunar_month == 4:
+                nu.event = "magha"
+            elif nu.lunar_month == 7:
+                nu.event = "vesakha"
+            elif nu.lunar_month == 13:
+                nu.event = "asalha"
+            elif nu.lunar_month == 11:
+                nu.event = "pavarana"
             else:
-                # Common Year and Adhikavara Year
-                if nu.lunar_month == 3:
-                    nu.event = "magha"
-                elif nu.lunar_month == 6:
-                    nu.event = "vesakha"
-                elif nu.lunar_month == 8:
-                    nu.event = "asalha"
-                elif nu.lunar_month == 11:
-                    nu.event = "pavarana"
-                else:
-                    nu.event = ""
+                nu.event = ""
 
         else:
-            # The New Moon uposatha begins a new month.
-
-            if lu.lunar_month == 13:
-                nu.lunar_month = 9 # Savana after 2nd Asalha
-            elif lu.lunar_month == 8 and is_adhikamasa_year:
-                nu.lunar_month = 13 # 2nd Asalha
-            elif lu.lunar_month == 12:
-                nu.lunar_month = 1
+            # Common Year and Adhikavara Year
+            if nu.lunar_month == 3:
+                nu.event = "magha"
+            elif nu.lunar_month == 6:
+                nu.event = "vesakha"
+            elif nu.lunar_month == 8:
+                nu.event = "asalha"
+            elif nu.lunar_month == 11:
+                nu.event = "pavarana"
             else:
-                nu.lunar_month = lu.lunar_month + 1
+                nu.event = ""
+
+    else:
+        # The New Moon uposatha begins a new month.
 
-            # Odd numbered months are 30 days, except in adhikavāra years when the 8th month is 30 days.
+        if lu.lunar_month == 13:
+            nu.lunar_month = 9 # Savana after 2nd Asalha
+        elif lu.lunar_month == 8 and is_adhikamasa_year:
+            nu.lunar_month = 13 # 2nd Asalha
+        elif lu.lunar_month == 12:
+            nu.lunar_month = 1
+        else:
+            nu.lunar_month = lu.lunar_month + 1
 
-            if is_adhikavara_year and nu.lunar_month == 8:
-                nu.has_adhikavara = True
+        # Odd numbered months are 30 days, except in adhikavāra years when the 8th month is 30 days.
+
+        if is_adhikavara_year and nu.lunar_month == 8:
+            nu.has_adhikavara = True
+            nu.m_days = 30
+        else:
+            if nu.lunar_month%2 == 1:
                 nu.m_days = 30
             else:
-                if nu.lunar_month%2 == 1:
-                    nu.m_days = 30
-                else:
-                    nu.m_days = 29
+                nu.m_days = 29
 
-            if nu.m_days == 29:
-                nu.u_days = 14
-            else:
-                nu.u_days = 15
+        if nu.m_days == 29:
+            nu.u_days = 14
+        else:
+            nu.u_days = 15
 
-            # Season
+        # Season
 
-            # In an adhikamāsa year the Hot Season is 10 uposatha long
+        # In an adhikamāsa year the Hot Season is 10 uposatha long
 
-            if is_adhikamasa_year and ((nu.lunar_month >= 5 and nu.lunar_month <= 8) or nu.lunar_month == 13):
-                nu.s_total = 10
-            else:
-                nu.s_total = 8
+        if is_adhikamasa_year and ((nu.lunar_month >= 5 and nu.lunar_month <= 8) or nu.lunar_month == 13):
+            nu.s_total = 10
+        else:
+            nu.s_total = 8
 
-            # If the last uposatha was not the last of the season, increment
+        # If the last uposatha was not the last of the season, increment
 
-            if lu.s_number < lu.s_total:
-                nu.s_number = lu.s_number + 1
-                nu.lunar_season = lu.lunar_season
-                nu.lunar_year = lu.lunar_year
+        if lu.s_number < lu.s_total:
+            nu.s_number = lu.s_number + 1
+            nu.lunar_season = lu.lunar_season
+            nu.lunar_year = lu.lunar_year
 
+        else:
+            # Else, it is the first uposatha of the season
+
+            nu.s_number = 1
+            # is it a new lunar year?
+            if lu.lunar_month == 12:
+                nu.lunar_season = 1
+                nu.lunar_year = lu.lunar_year + 1
             else:
-                # Else, it is the first uposatha of the season
+                nu.lunar_season = lu.lunar_season + 1
+                nu.lunar_year = lu.lunar_year
 
-                nu.s_number = 1
-                # is it a new lunar year?
-                if lu.lunar_month == 12:
-                    nu.lunar_season = 1
-                    nu.lunar_year = lu.lunar_year + 1
-                else:
-                    nu.lunar_season = lu.lunar_season + 1
-                    nu.lunar_year = lu.lunar_year
+    nu.date = lu.date + datetime.timedelta(days=nu.u_days)
 
-        nu.date = lu.date + datetime.timedelta(days=nu.u_days)
+    return nu
 
-        return nu
+def kattika_full_moon(date: datetime.date, lunar_year: int) -> UposathaMoon:
+    """
+    The Kattika Full Moon uposatha on date, with the attributes set in the
+    same order as step_uposatha() sets them.
+    """
 
-    def __str__(self) -> str:
-        if self.phase == "":
-            return ""
+    u = UposathaMoon()
+    u.phase =          "full"
+    u.s_number =       8
+    u.s_total =        8
+    u.u_days =         15
+    u.m_days =         29
+    u.lunar_month =    12
+    u.lunar_season =   3
+    u.lunar_year =     lunar_year
+    u.has_adhikavara = False
+    u.event =          ""
+    u.date =           date
 
-        return "{} Moon - {} day {} {}/{}".format(self.phase.title(),
-                                                  self.u_days,
-                                                  SEASON_NAME[self.lunar_season],
-                                                  self.s_number,
-                                                  self.s_total)
+    return u
+
+def kattika_uposatha(ce_year: int, engine: Optional[CalendarEngine] = None) -> UposathaMoon:
+    """
+    The Kattika Full Moon before ce_year, the last uposatha of the lunar year,
+    to step forward from.
+    """
+
+    if engine is None:
+        engine = default_engine()
+
+    prev_kattika = engine.previous_kattika(ce_year)
+
+    return kattika_full_moon(prev_kattika, prev_kattika.year + BE_DIFF)
+
+def iter_uposathas_from(moon: UposathaMoon, engine: Optional[CalendarEngine] = None) -> Iterator[UposathaMoon]:
+    """
+    The uposathas after moon, without end. The year flags are looked up
+    when the solar year changes, not for every step.
+    """
+
+    if engine is None:
+        engine = default_engine()
+
+    lu = moon
+    year = None
+    is_adhikamasa_year = False
+    is_adhikavara_year = False
+
+    while True:
+        # The flags of the solar year of the last uposatha, as in next_uposatha()
+        if lu.date.year != year:
+            year = lu.date.year
+            cal_year = engine.calendar_year(year)
+            is_adhikamasa_year = cal_year.is_adhikamasa()
+            is_adhikavara_year = cal_year.is_adhikavara()
+
+        lu = step_uposatha(lu, is_adhikamasa_year, is_adhikavara_year)
+        yield lu
+
+def iter_uposathas(start_date: datetime.date,
+                   end_date: Optional[datetime.date] = None,
+                   engine: Optional[CalendarEngine] = None) -> Iterator[UposathaMoon]:
+    """
+    The uposathas from start_date to end_date (inclusive), or without end if
+    end_date is None.
+    """
+
+    if engine is None:
+        engine = default_engine()
+
+    # Start from the last Kattika Full Moon before start_date, which may be
+    # in the same solar year.
+    year = start_date.year
+    if engine.previous_kattika(year + 1) < start_date:
+        year += 1
+
+    for u in iter_uposathas_from(kattika_uposatha(year, engine), engine):
+        if end_date is not None and u.date > end_date:
+            return
+        if u.date >= start_date:
+            yield u
+
+# Uposathas in the lunar year from one Kattika Full Moon to the next
+LUNAR_YEAR_UPOSATHAS: Dict[YearType, int] = {
+    YearType.Normal: 24,
+    YearType.Adhikavara: 24,
+    YearType.Adhikamasa: 26,
+}
+
+def advance(moon: UposathaMoon, n: int, engine: Optional[CalendarEngine] = None) -> UposathaMoon:
+    """
+    The n-th uposatha after moon. Steps to the end of the lunar year, skips
+    whole lunar years by their uposatha count and length, then steps to the
+    uposatha inside the last year.
+    """
+
+    if n < 0:
+        raise ValueError(f"Can only advance forward: {n}")
+
+    if engine is None:
+        engine = default_engine()
+
+    moons = iter_uposathas_from(moon, engine)
+    u = moon
+
+    # Step to the Kattika Full Moon, the last uposatha of the lunar year.
+    while n > 0 and not (u.phase == "full" and u.lunar_month == 12):
+        u = next(moons)
+        n -= 1
+
+    # The lunar year after the Kattika Full Moon in the solar year y has the
+    # length and uposatha count of the year y+1.
+    y = u.date.year
+    days = 0
+    while n > 0:
+        year_type = engine.year_type(y + 1)
+        count = LUNAR_YEAR_UPOSATHAS[year_type]
+        if count > n:
+            break
+
+        n -= count
+        days += engine.year_length(y + 1)
+        y += 1
+
+    if y != u.date.year:
+        u = kattika_full_moon(u.date + datetime.timedelta(days=days), u.lunar_year + (y - u.date.year))
+        moons = iter_uposathas_from(u, engine)
+
+    for _ in range(n):
+        u = next(moons)
+
+    return u
+
+def uposatha_at(date: datetime.date, index: int, engine: Optional[CalendarEngine] = None) -> UposathaMoon:
+    """
+    The uposatha index steps after the first uposatha on or after date. Index
+    0 is the first uposatha itself.
+    """
+
+    first = next(iter_uposathas(date, None, engine))
+
+    return advance(first, index, engine)
+
+class UposathaIndex:
+    """
+    The uposathas of each solar year, with their date ordinals in a sorted
+    array for the point queries. A year is calculated on its first query and
+    kept in a size-bounded LRU cache. Each CalendarEngine has one.
+
+    The returned UposathaMoon objects are shared between the queries, they
+    should not be modified.
+    """
+
+    maxsize: int
+
+    def __init__(self, engine: CalendarEngine, maxsize: int = YEAR_CACHE_MAXSIZE):
+        self.engine = engine
+        self.maxsize = maxsize
+        self._years: OrderedDict[int, Tuple[array, List[UposathaMoon]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def year(self, ce_year: int) -> Tuple[array, List[UposathaMoon]]:
+        """The date ordinals and the uposathas of the solar year."""
+
+        with self._lock:
+            entry = self._years.get(ce_year)
+            if entry is not None:
+                self._years.move_to_end(ce_year)
+                return entry
+
+        moons = list(iter_uposathas(datetime.date(ce_year, 1, 1), datetime.date(ce_year, 12, 31), self.engine))
+        entry = (array('l', (u.date.toordinal() for u in moons)), moons)
+
+        with self._lock:
+            self._years[ce_year] = entry
+            while len(self._years) > self.maxsize:
+                self._years.popitem(last=False)
+
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._years.clear()
+
+    def uposatha_on(self, date: datetime.date) -> Optional[UposathaMoon]:
+        ordinals, moons = self.year(date.year)
+        x = date.toordinal()
+        i = bisect_left(ordinals, x)
+        if i < len(ordinals) and ordinals[i] == x:
+            return moons[i]
+        return None
+
+    def is_uposatha(self, date: datetime.date) -> bool:
+        ordinals, _ = self.year(date.year)
+        x = date.toordinal()
+        i = bisect_left(ordinals, x)
+        return i < len(ordinals) and ordinals[i] == x
+
+    def next_uposatha_after(self, date: datetime.date) -> UposathaMoon:
+        ordinals, moons = self.year(date.year)
+        i = bisect_right(ordinals, date.toordinal())
+        if i < len(ordinals):
+            return moons[i]
+
+        # Every year has uposathas, the first of the next year is the next one.
+        return self.year(date.year + 1)[1][0]
+
+    def previous_uposatha_before(self, date: datetime.date) -> UposathaMoon:
+        ordinals, moons = self.year(date.year)
+        i = bisect_left(ordinals, date.toordinal())
+        if i > 0:
+            return moons[i - 1]
+
+        return self.year(date.year - 1)[1][-1]
+
+def is_uposatha(date: datetime.date, engine: Optional[CalendarEngine] = None) -> bool:
+    if engine is None:
+        engine = default_engine()
+    return engine.uposatha_index.is_uposatha(date)
+
+def uposatha_on(date: datetime.date, engine: Optional[CalendarEngine] = None) -> Optional[UposathaMoon]:
+    """The uposatha on the date, or None."""
+    if engine is None:
+        engine = default_engine()
+    return engine.uposatha_index.uposatha_on(date)
+
+def next_uposatha_after(date: datetime.date, engine: Optional[CalendarEngine] = None) -> UposathaMoon:
+    """The first uposatha after the date, not including the date itself."""
+    if engine is None:
+        engine = default_engine()
+    return engine.uposatha_index.next_uposatha_after(date)
+
+def previous_uposatha_before(date: datetime.date, engine: Optional[CalendarEngine] = None) -> UposathaMoon:
+    """The last uposatha before the date, not including the date itself."""
+    if engine is None:
+        engine = default_engine()
+    return engine.uposatha_index.previous_uposatha_before(date)
@@ -0,0 +1,145 @@
+"""
+Uposathas over long ranges, one typed array per attribute.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union, overload
+import datetime
+
+from splendidmoons.engine import CalendarEngine
+from splendidmoons.uposatha_moon import UposathaMoon, iter_uposathas
+
+PHASE_CODES: List[str] = ["", "new", "full"]
+
+EVENT_CODES: List[str] = ["", "magha", "vesakha", "asalha", "pavarana"]
+
+# Column name and array typecode, the other columns have the same name as the
+# UposathaMoon attribute.
+UPOSATHA_TABLE_COLUMNS: Dict[str, str] = {
+    "date_ordinal":   'l',
+    "phase":          'b',
+    "event":          'b',
+    "s_number":       'b',
+    "s_total":        'b',
+    "u_days":         'b',
+    "m_days":         'b',
+    "lunar_month":    'b',
+    "lunar_season":   'b',
+    "lunar_year":     'l',
+    "has_adhikavara": 'b',
+}
+
+_PHASE_CODE = {v: k for k, v in enumerate(PHASE_CODES)}
+_EVENT_CODE = {v: k for k, v in enumerate(EVENT_CODES)}
+
+class UposathaTable:
+    """
+    Columns of UposathaMoon attributes. Indexing with an int gives an
+    UposathaMoon, with a slice a new UposathaTable.
+    """
+
+    date_ordinal:   array
+    phase:          array
+    event:          array
+    s_number:       array
+    s_total:        array
+    u_days:         array
+    m_days:         array
+    lunar_month:    array
+    lunar_season:   array
+    lunar_year:     array
+    has_adhikavara: array
+
+    def __init__(self):
+        for name, typecode in UPOSATHA_TABLE_COLUMNS.items():
+            setattr(self, name, array(typecode))
+
+    def __len__(self) -> int:
+        return len(self.date_ordinal)
+
+    def append(self, u: UposathaMoon):
+        self.date_ordinal.append(u.date.toordinal())
+        self.phase.append(_PHASE_CODE[u.phase])
+        self.event.append(_EVENT_CODE[u.event])
+        self.s_number.append(u.s_number)
+        self.s_total.append(u.s_total)
+        self.u_days.append(u.u_days)
+        self.m_days.append(u.m_days)
+        self.lunar_month.append(u.lunar_month)
+        self.lunar_season.append(u.lunar_season)
+        self.lunar_year.append(u.lunar_year)
+        self.has_adhikavara.append(u.has_adhikavara)
+
+    def extend(self, moons: Iterable[UposathaMoon]):
+        for u in moons:
+            self.append(u)
+
+    @overload
+    def __getitem__(self, key: int) -> UposathaMoon: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> "UposathaTable": ...
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[UposathaMoon, "UposathaTable"]:
+        if isinstance(key, slice):
+            table = UposathaTable()
+            for name in UPOSATHA_TABLE_COLUMNS.keys():
+                setattr(table, name, getattr(self, name)[key])
+            return table
+
+        return self.moon(key)
+
+    def date(self, i: int) -> datetime.date:
+        return datetime.date.fromordinal(self.date_ordinal[i])
+
+    def moon(self, i: int) -> UposathaMoon:
+        """The UposathaMoon of the i-th row."""
+
+        u = UposathaMoon()
+        u.date =           self.date(i)
+        u.phase =          PHASE_CODES[self.phase[i]]
+        u.event =          EVENT_CODES[self.event[i]]
+        u.s_number =       self.s_number[i]
+        u.s_total =        self.s_total[i]
+        u.u_days =         self.u_days[i]
+        u.m_days =         self.m_days[i]
+        u.lunar_month =    self.lunar_month[i]
+        u.lunar_season =   self.lunar_season[i]
+        u.lunar_year =     self.lunar_year[i]
+        u.has_adhikavara = bool(self.has_adhikavara[i])
+
+        return u
+
+    def moons(self) -> Iterator[UposathaMoon]:
+        for i in range(len(self)):
+            yield self.moon(i)
+
+    def take(self, indexes: Iterable[int]) -> "UposathaTable":
+        """A new table of the given rows."""
+
+        indexes = list(indexes)
+        table = UposathaTable()
+        for name in UPOSATHA_TABLE_COLUMNS.keys():
+            column = getattr(self, name)
+            setattr(table, name, array(column.typecode, (column[i] for i in indexes)))
+
+        return table
+
+    def filter_event(self, event: str) -> "UposathaTable":
+        """The rows with the event (magha, vesakha, asalha, pavarana)."""
+        code = _EVENT_CODE[event]
+        return self.take(i for i, x in enumerate(self.event) if x == code)
+
+    def filter_season(self, lunar_season: int) -> "UposathaTable":
+        """The rows in the season (1-3, see SEASON_NAME)."""
+        return self.take(i for i, x in enumerate(self.lunar_season) if x == lunar_season)
+
+def uposatha_table(start_date: datetime.date,
+                   end_date: datetime.date,
+                   engine: Optional[CalendarEngine] = None) -> UposathaTable:
+    """The uposathas from start_date to end_date (inclusive)."""
+
+    table = UposathaTable()
+    table.extend(iter_uposathas(start_date, end_date, engine))
+
+    return table
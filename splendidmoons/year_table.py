@@ -0,0 +1,195 @@
+"""
+Precomputed year classification, loaded from the generated year_table_data.py
+when its fingerprint matches the ruleset.
+"""
+
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+import datetime
+import hashlib
+
+import splendidmoons
+from splendidmoons import calendar_consts
+
+if TYPE_CHECKING:
+    from splendidmoons.engine import CalendarEngine
+
+YEAR_TABLE_DATA_PATH = Path(__file__).parent / "year_table_data.py"
+
+YEAR_TABLE_FROM_YEAR = 1800
+YEAR_TABLE_TO_YEAR = 2300
+
+# Increment when the layout of the generated module changes.
+YEAR_TABLE_FORMAT = 1
+
+YEAR_TABLE_MODULE_TMPL = """# Generated by `splendidmoons generate-year-table`, do not edit.
+# Years {from_year}-{to_year}, see splendidmoons/year_table.py
+
+from array import array
+
+FINGERPRINT = "{fingerprint}"
+
+FROM_YEAR = {from_year}
+TO_YEAR = {to_year}
+
+# YearType of each year
+YEAR_TYPES = bytes.fromhex(
+{year_types}
+)
+
+YEAR_LENGTHS = array('H', [
+{year_lengths}
+])
+
+# date.toordinal() of the Kattika full moon before each year
+PREV_KATTIKA_ORDINALS = array('l', [
+{prev_kattika}
+])
+
+# date.toordinal() of Asalha Puja in each year
+ASALHA_PUJA_ORDINALS = array('l', [
+{asalha_puja}
+])
+"""
+
+def year_table_fingerprint(adhikavara_exceptions: Dict[int, bool]) -> str:
+    """Hash of the calendar constants and the adhikavāra exceptions of a ruleset."""
+
+    consts = sorted((k, repr(v)) for k, v in vars(calendar_consts).items() if k.isupper())
+
+    exceptions = sorted(adhikavara_exceptions.items())
+
+    text = repr((YEAR_TABLE_FORMAT, consts, exceptions))
+
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class YearTable:
+    from_year:             int
+    to_year:               int
+    year_types:            bytes
+    year_lengths:          array
+    prev_kattika_ordinals: array
+    asalha_puja_ordinals:  array
+
+    def __init__(self,
+                 from_year: int,
+                 to_year: int,
+                 year_types: bytes,
+                 year_lengths: array,
+                 prev_kattika_ordinals: array,
+                 asalha_puja_ordinals: array):
+        self.from_year = from_year
+        self.to_year = to_year
+        self.year_types = year_types
+        self.year_lengths = year_lengths
+        self.prev_kattika_ordinals = prev_kattika_ordinals
+        self.asalha_puja_ordinals = asalha_puja_ordinals
+
+    def covers(self, ce_year: int) -> bool:
+        return self.from_year <= ce_year <= self.to_year
+
+    def year_type(self, ce_year: int) -> int:
+        return self.year_types[ce_year - self.from_year]
+
+    def year_length(self, ce_year: int) -> int:
+        return self.year_lengths[ce_year - self.from_year]
+
+    def prev_kattika_ordinal(self, ce_year: int) -> int:
+        return self.prev_kattika_ordinals[ce_year - self.from_year]
+
+    def asalha_puja_ordinal(self, ce_year: int) -> int:
+        return self.asalha_puja_ordinals[ce_year - self.from_year]
+
+def load_year_table(adhikavara_exceptions: Dict[int, bool]) -> Optional[YearTable]:
+    """
+    The generated YearTable, or None if it is missing or was generated with
+    different constants or exceptions.
+    """
+
+    try:
+        from splendidmoons import year_table_data as data
+    except ImportError:
+        return None
+
+    if getattr(data, "FINGERPRINT", None) != year_table_fingerprint(adhikavara_exceptions):
+        if splendidmoons.verbose:
+            print("Ignoring year_table_data.py, it was generated with different constants or exceptions.")
+        return None
+
+    return YearTable(
+        from_year = data.FROM_YEAR,
+        to_year = data.TO_YEAR,
+        year_types = data.YEAR_TYPES,
+        year_lengths = data.YEAR_LENGTHS,
+        prev_kattika_ordinals = data.PREV_KATTIKA_ORDINALS,
+        asalha_puja_ordinals = data.ASALHA_PUJA_ORDINALS,
+    )
+
+def _wrap(items: List[str], per_line: int) -> str:
+    lines = []
+    for i in range(0, len(items), per_line):
+        lines.append("    " + " ".join(items[i:i+per_line]))
+    return "\n".join(lines)
+
+def generate_year_table_module(from_year: int = YEAR_TABLE_FROM_YEAR,
+                               to_year: int = YEAR_TABLE_TO_YEAR,
+                               engine: Optional["CalendarEngine"] = None) -> str:
+    """
+    Source code of year_table_data.py for the years from_year to to_year,
+    with the ruleset of the engine (or the default engine).
+    """
+
+    # Imported here, calendar_year imports this module.
+    from splendidmoons.calendar_year import ASALHA_PUJA_DAYS, KATTIKA_EPOCH_DATE_TUPLE
+    from splendidmoons.engine import default_engine
+    from splendidmoons.suriya_array import CalendarYearArray
+
+    if engine is None:
+        engine = default_engine()
+
+    # Calculate the Kattika dates from the epoch, without the caches which
+    # may themselves be using a previously generated table.
+    epoch_year = KATTIKA_EPOCH_DATE_TUPLE[0]
+    years = CalendarYearArray(min(from_year - 1, epoch_year), max(to_year, epoch_year), engine)
+
+    y, m, d = KATTIKA_EPOCH_DATE_TUPLE
+    epoch_ordinal = datetime.date(y, m, d).toordinal()
+
+    # Kattika in the solar year y, for each year of the CalendarYearArray
+    kattika: Dict[int, int] = {epoch_year: epoch_ordinal}
+    for y in range(epoch_year + 1, years.to_year + 1):
+        kattika[y] = kattika[y - 1] + years.year_length[years.index(y)]
+    for y in range(epoch_year - 1, years.from_year - 1, -1):
+        kattika[y] = kattika[y + 1] - years.year_length[years.index(y + 1)]
+
+    year_types: List[str] = []
+    year_lengths: List[str] = []
+    prev_kattika: List[str] = []
+    asalha_puja: List[str] = []
+
+    for y in range(from_year, to_year + 1):
+        i = years.index(y)
+        year_types.append("%02x" % years.year_type[i])
+        year_lengths.append("%d," % years.year_length[i])
+        prev_kattika.append("%d," % kattika[y - 1])
+
+        asalha_puja.append("%d," % (kattika[y - 1] + ASALHA_PUJA_DAYS[years.year_type[i]]))
+
+    return YEAR_TABLE_MODULE_TMPL.format(
+        fingerprint = year_table_fingerprint(engine.ruleset.adhikavara_exceptions),
+        from_year = from_year,
+        to_year = to_year,
+        year_types = _wrap(['"' + "".join(year_types[i:i+32]) + '"' for i in range(0, len(year_types), 32)], 1),
+        year_lengths = _wrap(year_lengths, 16),
+        prev_kattika = _wrap(prev_kattika, 10),
+        asalha_puja = _wrap(asalha_puja, 10),
+    )
+
+def write_year_table_module(path: Path = YEAR_TABLE_DATA_PATH,
+                            from_year: int = YEAR_TABLE_FROM_YEAR,
+                            to_year: int = YEAR_TABLE_TO_YEAR):
+    text = generate_year_table_module(from_year, to_year)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
@@ -0,0 +1,174 @@
+# Generated by `splendidmoons generate-year-table`, do not edit.
+# Years 1800-2300, see splendidmoons/year_table.py
+
+from array import array
+
+FINGERPRINT = "8b50c649331bc26bfa1888615e73a8749b2581615dc4f8e05625a4c3de97cfd1"
+
+FROM_YEAR = 1800
+TO_YEAR = 2300
+
+# YearType of each year
+YEAR_TYPES = bytes.fromhex(
+    "0001000201000100020100000102000100010002010000010201000001020001"
+    "0000010201000001020001000102000100020100000100010200010002010001"
+    "0002010000010200010001020001000001020100000102000100010200010000"
+    "0102000100010200010002010001000201000001000201000100020100000102"
+    "0100000102000100000102010000010200010001020001000001020001000102"
+    "0001000201000100020100000102000100010200010000010201000001020001"
+    "0001020001000001020001000102000100020100010000010200010002010001"
+    "0002010000010201000001020001000001020100000102000100010200010000"
+    "0102000100010200010002010001000201000001020001000100020100000102"
+    "0100000102000100000102010000010200010001020001000001020001000102"
+    "0001000201000100020100000102000100010200010000010201000001020001"
+    "0001020001000001020001000102000100020100010002010000010002010001"
+    "0002010000010201000001020001000001020100000102000100010200010000"
+    "0102000100010200010002010001000201000001020001000102000100000102"
+    "0100000102000100010200010000010200010001020001000201000100000102"
+    "000100020100010002010000010201000001020001"
+)
+
+YEAR_LENGTHS = array('H', [
+    354, 384, 354, 355, 384, 354, 384, 354, 355, 384, 354, 354, 384, 355, 354, 384,
+    354, 384, 354, 355, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355, 354, 384,
+    354, 354, 384, 355, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384,
+    354, 355, 384, 354, 354, 384, 354, 384, 355, 354, 384, 354, 355, 384, 354, 384,
+    354, 355, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 354,
+    384, 355, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 354,
+    384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 355, 384, 354, 384, 354, 355,
+    384, 354, 354, 384, 354, 355, 384, 354, 384, 354, 355, 384, 354, 354, 384, 355,
+    384, 354, 354, 384, 355, 354, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355,
+    354, 384, 354, 384, 355, 354, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355,
+    354, 384, 354, 355, 384, 354, 384, 354, 355, 384, 354, 354, 384, 355, 354, 384,
+    354, 384, 355, 354, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355, 354, 384,
+    354, 384, 355, 354, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384,
+    354, 355, 384, 354, 384, 354, 354, 384, 355, 354, 384, 354, 355, 384, 354, 384,
+    354, 355, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355, 354, 384, 354, 354,
+    384, 355, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 354,
+    384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 355, 384, 354, 384, 354, 355,
+    384, 354, 354, 384, 355, 354, 384, 354, 384, 354, 355, 384, 354, 354, 384, 355,
+    384, 354, 354, 384, 355, 354, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355,
+    354, 384, 354, 384, 355, 354, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355,
+    354, 384, 354, 355, 384, 354, 384, 354, 355, 384, 354, 354, 384, 355, 354, 384,
+    354, 384, 355, 354, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355, 354, 384,
+    354, 384, 355, 354, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384,
+    354, 355, 384, 354, 384, 354, 355, 384, 354, 354, 384, 354, 355, 384, 354, 384,
+    354, 355, 384, 354, 354, 384, 355, 384, 354, 354, 384, 355, 354, 384, 354, 354,
+    384, 355, 384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 354,
+    384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 355, 384, 354, 384, 354, 355,
+    384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 354, 384, 355,
+    384, 354, 354, 384, 355, 354, 384, 354, 384, 355, 354, 384, 354, 354, 384, 355,
+    354, 384, 354, 384, 355, 354, 384, 354, 355, 384, 354, 384, 354, 354, 384, 355,
+    354, 384, 354, 355, 384, 354, 384, 354, 355, 384, 354, 354, 384, 355, 384, 354,
+    354, 384, 355, 354, 384,
+])
+
+# date.toordinal() of the Kattika full moon before each year
+PREV_KATTIKA_ORDINALS = array('l', [
+    657022, 657376, 657760, 658114, 658469, 658853, 659207, 659591, 659945, 660300,
+    660684, 661038, 661392, 661776, 662131, 662485, 662869, 663223, 663607, 663961,
+    664316, 664700, 665054, 665408, 665792, 666147, 666531, 666885, 667239, 667623,
+    667978, 668332, 668716, 669070, 669424, 669808, 670163, 670547, 670901, 671255,
+    671639, 671994, 672348, 672732, 673086, 673470, 673825, 674179, 674563, 674917,
+    675272, 675656, 676010, 676364, 676748, 677102, 677486, 677841, 678195, 678579,
+    678933, 679288, 679672, 680026, 680410, 680764, 681119, 681503, 681857, 682211,
+    682595, 682950, 683304, 683688, 684042, 684426, 684781, 685135, 685519, 685873,
+    686227, 686611, 686966, 687350, 687704, 688058, 688442, 688797, 689151, 689535,
+    689889, 690273, 690628, 690982, 691366, 691720, 692074, 692458, 692813, 693167,
+    693551, 693905, 694289, 694644, 694998, 695382, 695736, 696091, 696475, 696829,
+    697213, 697567, 697922, 698306, 698660, 699014, 699398, 699752, 700107, 700491,
+    700845, 701229, 701583, 701938, 702322, 702676, 703030, 703414, 703769, 704153,
+    704507, 704861, 705245, 705600, 705954, 706338, 706692, 707046, 707430, 707785,
+    708169, 708523, 708877, 709261, 709616, 709970, 710354, 710708, 711092, 711447,
+    711801, 712185, 712539, 712893, 713277, 713632, 713986, 714370, 714724, 715108,
+    715463, 715817, 716201, 716555, 716910, 717294, 717648, 718032, 718386, 718741,
+    719125, 719479, 719833, 720217, 720572, 720926, 721310, 721664, 722048, 722403,
+    722757, 723141, 723495, 723849, 724233, 724588, 724972, 725326, 725680, 726064,
+    726419, 726773, 727157, 727511, 727895, 728250, 728604, 728988, 729342, 729696,
+    730080, 730435, 730789, 731173, 731527, 731911, 732266, 732620, 733004, 733358,
+    733713, 734097, 734451, 734835, 735189, 735543, 735927, 736282, 736636, 737020,
+    737374, 737729, 738113, 738467, 738851, 739205, 739560, 739944, 740298, 740652,
+    741036, 741391, 741775, 742129, 742483, 742867, 743222, 743576, 743960, 744314,
+    744668, 745052, 745407, 745791, 746145, 746499, 746883, 747238, 747592, 747976,
+    748330, 748714, 749069, 749423, 749807, 750161, 750515, 750899, 751254, 751608,
+    751992, 752346, 752730, 753085, 753439, 753823, 754177, 754532, 754916, 755270,
+    755654, 756008, 756363, 756747, 757101, 757455, 757839, 758194, 758548, 758932,
+    759286, 759670, 760024, 760379, 760763, 761117, 761471, 761855, 762210, 762594,
+    762948, 763302, 763686, 764041, 764395, 764779, 765133, 765487, 765871, 766226,
+    766610, 766964, 767318, 767702, 768057, 768411, 768795, 769149, 769533, 769888,
+    770242, 770626, 770980, 771334, 771718, 772073, 772427, 772811, 773165, 773549,
+    773904, 774258, 774642, 774996, 775351, 775735, 776089, 776473, 776827, 777182,
+    777566, 777920, 778274, 778658, 779013, 779367, 779751, 780105, 780489, 780844,
+    781198, 781582, 781936, 782290, 782674, 783029, 783413, 783767, 784121, 784505,
+    784860, 785214, 785598, 785952, 786336, 786691, 787045, 787429, 787783, 788137,
+    788521, 788876, 789230, 789614, 789968, 790352, 790707, 791061, 791445, 791799,
+    792154, 792538, 792892, 793276, 793630, 793985, 794369, 794723, 795077, 795461,
+    795815, 796170, 796554, 796908, 797292, 797646, 798001, 798385, 798739, 799093,
+    799477, 799832, 800216, 800570, 800924, 801308, 801663, 802017, 802401, 802755,
+    803109, 803493, 803848, 804232, 804586, 804940, 805324, 805679, 806033, 806417,
+    806771, 807155, 807510, 807864, 808248, 808602, 808956, 809340, 809695, 810049,
+    810433, 810787, 811171, 811526, 811880, 812264, 812618, 812973, 813357, 813711,
+    814095, 814449, 814804, 815188, 815542, 815896, 816280, 816635, 816989, 817373,
+    817727, 818111, 818466, 818820, 819204, 819558, 819912, 820296, 820651, 821035,
+    821389, 821743, 822127, 822482, 822836, 823220, 823574, 823958, 824313, 824667,
+    825051, 825405, 825759, 826143, 826498, 826852, 827236, 827590, 827974, 828329,
+    828683, 829067, 829421, 829776, 830160, 830514, 830898, 831252, 831606, 831990,
+    832345, 832699, 833083, 833437, 833792, 834176, 834530, 834914, 835268, 835623,
+    836007, 836361, 836715, 837099, 837454, 837838, 838192, 838546, 838930, 839285,
+    839639,
+])
+
+# date.toordinal() of Asalha Puja in each year
+ASALHA_PUJA_ORDINALS = array('l', [
+    657258, 657642, 657996, 658351, 658735, 659089, 659473, 659827, 660182, 660566,
+    660920, 661274, 661658, 662013, 662367, 662751, 663105, 663489, 663843, 664198,
+    664582, 664936, 665290, 665674, 666029, 666413, 666767, 667121, 667505, 667860,
+    668214, 668598, 668952, 669306, 669690, 670045, 670429, 670783, 671137, 671521,
+    671876, 672230, 672614, 672968, 673352, 673707, 674061, 674445, 674799, 675154,
+    675538, 675892, 676246, 676630, 676984, 677368, 677723, 678077, 678461, 678815,
+    679170, 679554, 679908, 680292, 680646, 681001, 681385, 681739, 682093, 682477,
+    682832, 683186, 683570, 683924, 684308, 684663, 685017, 685401, 685755, 686109,
+    686493, 686848, 687232, 687586, 687940, 688324, 688679, 689033, 689417, 689771,
+    690155, 690510, 690864, 691248, 691602, 691956, 692340, 692695, 693049, 693433,
+    693787, 694171, 694526, 694880, 695264, 695618, 695973, 696357, 696711, 697095,
+    697449, 697804, 698188, 698542, 698896, 699280, 699634, 699989, 700373, 700727,
+    701111, 701465, 701820, 702204, 702558, 702912, 703296, 703651, 704035, 704389,
+    704743, 705127, 705482, 705836, 706220, 706574, 706928, 707312, 707667, 708051,
+    708405, 708759, 709143, 709498, 709852, 710236, 710590, 710974, 711329, 711683,
+    712067, 712421, 712775, 713159, 713514, 713868, 714252, 714606, 714990, 715345,
+    715699, 716083, 716437, 716792, 717176, 717530, 717914, 718268, 718623, 719007,
+    719361, 719715, 720099, 720454, 720808, 721192, 721546, 721930, 722285, 722639,
+    723023, 723377, 723731, 724115, 724470, 724854, 725208, 725562, 725946, 726301,
+    726655, 727039, 727393, 727777, 728132, 728486, 728870, 729224, 729578, 729962,
+    730317, 730671, 731055, 731409, 731793, 732148, 732502, 732886, 733240, 733595,
+    733979, 734333, 734717, 735071, 735425, 735809, 736164, 736518, 736902, 737256,
+    737611, 737995, 738349, 738733, 739087, 739442, 739826, 740180, 740534, 740918,
+    741273, 741657, 742011, 742365, 742749, 743104, 743458, 743842, 744196, 744550,
+    744934, 745289, 745673, 746027, 746381, 746765, 747120, 747474, 747858, 748212,
+    748596, 748951, 749305, 749689, 750043, 750397, 750781, 751136, 751490, 751874,
+    752228, 752612, 752967, 753321, 753705, 754059, 754414, 754798, 755152, 755536,
+    755890, 756245, 756629, 756983, 757337, 757721, 758076, 758430, 758814, 759168,
+    759552, 759906, 760261, 760645, 760999, 761353, 761737, 762092, 762476, 762830,
+    763184, 763568, 763923, 764277, 764661, 765015, 765369, 765753, 766108, 766492,
+    766846, 767200, 767584, 767939, 768293, 768677, 769031, 769415, 769770, 770124,
+    770508, 770862, 771216, 771600, 771955, 772309, 772693, 773047, 773431, 773786,
+    774140, 774524, 774878, 775233, 775617, 775971, 776355, 776709, 777064, 777448,
+    777802, 778156, 778540, 778895, 779249, 779633, 779987, 780371, 780726, 781080,
+    781464, 781818, 782172, 782556, 782911, 783295, 783649, 784003, 784387, 784742,
+    785096, 785480, 785834, 786218, 786573, 786927, 787311, 787665, 788019, 788403,
+    788758, 789112, 789496, 789850, 790234, 790589, 790943, 791327, 791681, 792036,
+    792420, 792774, 793158, 793512, 793867, 794251, 794605, 794959, 795343, 795697,
+    796052, 796436, 796790, 797174, 797528, 797883, 798267, 798621, 798975, 799359,
+    799714, 800098, 800452, 800806, 801190, 801545, 801899, 802283, 802637, 802991,
+    803375, 803730, 804114, 804468, 804822, 805206, 805561, 805915, 806299, 806653,
+    807037, 807392, 807746, 808130, 808484, 808838, 809222, 809577, 809931, 810315,
+    810669, 811053, 811408, 811762, 812146, 812500, 812855, 813239, 813593, 813977,
+    814331, 814686, 815070, 815424, 815778, 816162, 816517, 816871, 817255, 817609,
+    817993, 818348, 818702, 819086, 819440, 819794, 820178, 820533, 820917, 821271,
+    821625, 822009, 822364, 822718, 823102, 823456, 823840, 824195, 824549, 824933,
+    825287, 825641, 826025, 826380, 826734, 827118, 827472, 827856, 828211, 828565,
+    828949, 829303, 829658, 830042, 830396, 830780, 831134, 831488, 831872, 832227,
+    832581, 832965, 833319, 833674, 834058, 834412, 834796, 835150, 835505, 835889,
+    836243, 836597, 836981, 837336, 837720, 838074, 838428, 838812, 839167, 839521,
+    839905,
+])
@@ -2,12 +2,29 @@
 """
 
 import datetime
-from typing import Dict, List, TypedDict
+import json
+import pytest
+from typing import Dict, List, Sequence, TypedDict
 from splendidmoons.calendar_consts import HORAKHUN_REF, HORAKHUN_REF_DATE_TUPLE
 
-from splendidmoons.calendar_day import SURIYA_DAY_VALUES_FMT, CalendarDay
-from splendidmoons.calendar_year import SURIYA_YEAR_VALUES_FMT, CalendarYear
-from splendidmoons.helpers import degree_to_ral_str, horakhun_to_date
+from splendidmoons.calendar_day import SURIYA_DAY_VALUES_FMT, CalendarDay, verify_suriya_arithmetic
+from splendidmoons.calendar_year import (SURIYA_YEAR_VALUES_FMT, CalendarYear, YearCache, YearType, classify_years, leap_years_between,
+                                         next_adhikamasa, previous_adhikavara)
+from splendidmoons.helpers import date_to_horakhun, degree_to_ral_str, horakhun_to_date
+from splendidmoons.suriya_array import (CALENDAR_DAY_VALUE_NAMES, SURIYA_VALUE_NAMES, CalendarYearArray, calendar_days,
+                                         calendar_days_for_ordinals, calendar_days_range)
+from splendidmoons.engine import HISTORICAL_RULESET, PURE_RULESET, CalendarEngine, Ruleset, engine_for
+from splendidmoons.json_cal_day import (CalDayIndex, JsonCalDay, add_event_to_json_cal_day, add_half_moon_days,
+                                        generate_solar_year, get_json_cal_days, iter_json_cal_days, merge_event_into_cal_days,
+                                        write_day_records_json, write_day_records_jsonl)
+from splendidmoons.event import Event
+from splendidmoons.event_helpers import MOON_PHASE_DAY_TEXT, iter_calendar_events, year_moondays, year_moondays_associated_events
+from splendidmoons.ical import HasIcalEvent
+from splendidmoons.uposatha_moon import (UposathaMoon, advance, is_uposatha, iter_uposathas, kattika_uposatha, next_uposatha_after,
+                                         previous_uposatha_before, uposatha_at, uposatha_on)
+from splendidmoons.uposatha_table import uposatha_table
+from splendidmoons.raek_index import RaekIndex, raek_mansion
+from splendidmoons.year_table import YEAR_TABLE_DATA_PATH, generate_year_table_module, load_year_table
 
 TEST_ADHIKAMASA_YEAR: Dict[int, bool] = {
     # --- T = thaiorc.com, M = myhora.com, F = fs-cal, K = Khemanando
@@ -197,6 +214,121 @@ def test_adhikavara_years():
     for year, expected in TEST_ADHIKAVARA_YEAR.items():
         assert CalendarYear(year).is_adhikavara() is expected
 
+def test_year_cache():
+    cache = YearCache(maxsize = 4)
+
+    assert cache.year_type(2023) == YearType.Adhikamasa
+    assert cache.year_length(2023) == 384
+    assert cache.asalha_puja(2023).isoformat() == "2023-08-01"
+
+    misses = cache.info()['misses']
+    assert cache.get(2023) is cache.get(2023)
+    assert cache.info()['misses'] == misses
+
+    for year in range(2000, 2010):
+        cache.get(year)
+    assert cache.info()['currsize'] == 4
+
+    cache.clear()
+    assert cache.info() == {'hits': 0, 'misses': 0, 'maxsize': 4, 'currsize': 0}
+
+def test_calculate_previous_kattika():
+    # Far from the 2015 epoch in both directions, and across the epoch.
+    expected: Dict[int, str] = {
+        1600: "1599-11-02",
+        1700: "1699-11-06",
+        2015: "2014-11-06",
+        2016: "2015-11-25",
+        2017: "2016-11-14",
+        2500: "2499-11-18",
+    }
+
+    for year, date in expected.items():
+        assert CalendarYear(year).calculate_previous_kattika().isoformat() == date
+
+def test_calendar_year_array():
+    years = CalendarYearArray(1500, 2600)
+
+    for year in range(1500, 2601):
+        y = CalendarYear(year)
+        i = years.index(year)
+
+        for name in SURIYA_VALUE_NAMES:
+            assert getattr(years, name)[i] == getattr(y, name)
+
+        assert bool(years.would_be_adhikamasa[i]) is y.would_be_adhikamasa()
+        assert bool(years.is_adhikamasa[i]) is y.is_adhikamasa()
+        assert bool(years.would_be_adhikavara[i]) is y.would_be_adhikavara()
+        assert bool(years.is_adhikavara[i]) is y.is_adhikavara()
+        assert years.year_type[i] == y.year_type()
+        assert years.year_length[i] == y.year_length()
+
+def test_leap_year_index():
+    expected_masa = [y for y, v in TEST_ADHIKAMASA_YEAR.items() if v]
+    assert leap_years_between(1950, 2018, YearType.Adhikamasa) == expected_masa
+
+    expected_vara = [y for y, v in TEST_ADHIKAVARA_YEAR.items() if v]
+    assert leap_years_between(1993, 2016, YearType.Adhikavara) == expected_vara
+
+    assert next_adhikamasa(2021) == 2023
+    assert previous_adhikavara(2016) == 2009
+
+    assert CalendarYear(2023).delta_adhikamasa() == 2
+    assert CalendarYear(2016).delta_adhikavara() == 7
+
+    years = CalendarYearArray(1000, 1200)
+    expected = [1000 + i for i, t in enumerate(years.year_type) if t != YearType.Normal]
+    assert leap_years_between(1000, 1200) == expected
+
+def test_classify_years():
+    for c in classify_years(1600, 2600):
+        y = CalendarYear(c.year)
+        assert c.year_type == y.year_type()
+        assert c.year_length == y.year_length()
+        assert c.kattika_date == y.calculate_previous_kattika()
+        assert c.asalha_puja == y.asalha_puja()
+
+def test_calendar_engine_rulesets():
+    pure = CalendarEngine(PURE_RULESET)
+    historical = CalendarEngine(HISTORICAL_RULESET)
+
+    assert pure.calendar_year(1994).is_adhikavara() is True
+    assert historical.calendar_year(1994).is_adhikavara() is False
+    assert pure.calendar_year(1997).is_adhikavara() is False
+    assert historical.calendar_year(1997).is_adhikavara() is True
+
+    assert pure.asalha_puja(1994).isoformat() == "1994-07-23"
+    assert historical.asalha_puja(1994).isoformat() == "1994-07-22"
+    assert pure.previous_kattika(1996) != historical.previous_kattika(1996)
+
+    # The years of one engine are not shared with the other.
+    assert pure.calendar_year(1994) is not historical.calendar_year(1994)
+    assert pure.calendar_year(1994).engine is pure
+
+    # Shared engines are kept by the whole ruleset, not only its name.
+    custom = Ruleset("pure", {1994: False})
+    assert engine_for(custom) is not engine_for(PURE_RULESET)
+    assert engine_for(custom) is engine_for(Ruleset("pure", {1994: False}))
+    assert engine_for(Ruleset("pure")) is engine_for(PURE_RULESET)
+    assert engine_for(custom).calendar_year(1994).is_adhikavara() is False
+    assert engine_for(PURE_RULESET).calendar_year(1994).is_adhikavara() is True
+
+    # The per-year, the windowed and the array classification apply the same
+    # adhikavāra rule with the exceptions.
+    years = CalendarYearArray(1950, 2050, historical)
+    classified = list(historical.classify_years(1950, 2050))
+    for i, year in enumerate(range(1950, 2051)):
+        assert years.year_type[i] == classified[i].year_type == historical.year_type(year)
+
+def test_year_table():
+    # The generated module is up to date with the calculation.
+    with open(YEAR_TABLE_DATA_PATH, 'r', encoding='utf-8') as f:
+        assert f.read() == generate_year_table_module()
+
+    assert load_year_table({}) is not None
+    # Generated with different exceptions, it is rejected.
+    assert load_year_table({1994: False, 1997: True}) is None
+
 class CalendarYearData(TypedDict):
     Year: int
     BE_Year: int
@@ -326,6 +458,33 @@ def test_calendar_day_init():
 
         assert d_str == exp_d_str
 
+def test_calendar_day_lazy_positions():
+    day = CalendarDay(2015, 100)
+    assert day._raek is None and day._mean_sun is None
+
+    days = calendar_days(2015, [100])
+    assert (day.mean_sun, day.true_sun, day.mean_moon, day.true_moon, day.raek) == \
+        (days.mean_sun[0], days.true_sun[0], days.mean_moon[0], days.true_moon[0], days.raek[0])
+    assert day._raek == days.raek[0]
+
+    assert not hasattr(day, '__dict__')
+
+def test_verify_suriya_arithmetic():
+    assert verify_suriya_arithmetic(-500, 3000, days = [0, 103, 200, 384]) == []
+
+def test_calendar_days():
+    for year in [638, 1288, 1565, 1963, 2015]:
+        days = calendar_days(year)
+
+        for i in range(0, len(days), 11):
+            d = CalendarDay(year, days.day[i])
+            for name in CALENDAR_DAY_VALUE_NAMES:
+                assert getattr(days, name)[i] == getattr(d, name)
+
+    # Consecutive lunar years continue the horakhun without gaps.
+    days = calendar_days_range(2020, 2023)
+    assert list(days.horakhun) == list(range(days.horakhun[0], days.horakhun[0] + len(days)))
+
 def test_asalha_puja():
     for year, expected in TEST_ASALHA_PUJA_YEARS.items():
         assert CalendarYear(year).asalha_puja().isoformat() == expected
@@ -401,6 +560,42 @@ TEST_HORAKHUN_TO_DATE_STR: Dict[int, str] = {
     502857: "2015 Jan 01", # myhora.com
 }
 
+def test_raek_index(tmp_path):
+    index = RaekIndex.build(2019, 2021)
+    path = tmp_path / "raek.idx"
+    index.save(path)
+    loaded = RaekIndex.load(path)
+
+    start = datetime.date(2020, 1, 1)
+    end = datetime.date(2020, 12, 31)
+
+    expected_days: Dict[int, List[datetime.date]] = {n: [] for n in range(1, 28)}
+    expected_transitions = []
+    prev = raek_mansion(CalendarDay.from_date(start - datetime.timedelta(days=1)).raek)
+    for x in range(start.toordinal(), end.toordinal() + 1):
+        date = datetime.date.fromordinal(x)
+        n = raek_mansion(CalendarDay.from_date(date).raek)
+        expected_days[n].append(date)
+        if n != prev:
+            expected_transitions.append((date, n))
+        prev = n
+
+    for ix in [index, loaded]:
+        for n in range(1, 28):
+            assert ix.days_in_raek(n, start, end) == expected_days[n]
+        assert ix.raek_transitions(start, end) == expected_transitions
+
+    # The offsets are read from the file, saving them again gives the same file
+    resaved = tmp_path / "raek2.idx"
+    loaded.save(resaved)
+    assert resaved.read_bytes() == path.read_bytes()
+
+    loaded.close()
+    for use in [lambda: len(loaded), lambda: loaded.mansion(start), lambda: loaded.end_horakhun,
+                lambda: loaded.days_in_raek(1, start, end), lambda: loaded.raek_transitions(start, end)]:
+        with pytest.raises(ValueError, match="closed"):
+            use()
+
 def test_day():
     # Test HORAKHUN_REF constant
     y, m, d = HORAKHUN_REF_DATE_TUPLE
@@ -456,3 +651,280 @@ True Moon: {}
            degree_to_ral_str(day.true_moon))
 
     assert res == expected
+
+def test_calendar_day_from_date():
+    day = CalendarDay.from_date(datetime.date(1566, 1, 3))
+    assert (day.year, day.day) == (1565, 298)
+
+    day = CalendarDay.from_date(datetime.date(1963, 7, 5))
+    assert (day.year, day.day) == (1963, 103)
+
+    for horakhun, expected in TEST_HORAKHUN_TO_DATE_STR.items():
+        y, b, d = expected.split(" ")
+        date = datetime.date(int(y), datetime.datetime.strptime(b, "%b").month, int(d))
+        assert date_to_horakhun(date) == horakhun
+        assert CalendarDay.from_date(date).horakhun == horakhun
+
+    start = datetime.date(2019, 12, 1).toordinal()
+    ordinals = list(range(start, start + 500, 3))
+    days = calendar_days_for_ordinals(ordinals)
+    for i, x in enumerate(ordinals):
+        d = CalendarDay.from_date(datetime.date.fromordinal(x))
+        assert (days.year[i], days.day[i], days.true_moon[i]) == (d.year, d.day, d.true_moon)
+
+def test_iter_uposathas():
+    start = datetime.date(1990, 1, 1)
+    end = datetime.date(2030, 12, 31)
+
+    expected = []
+    for year in range(start.year, end.year + 1):
+        expected.extend(e for e in generate_solar_year(year) if isinstance(e, UposathaMoon))
+
+    moons = list(iter_uposathas(start, end))
+    assert [u.__dict__ for u in moons] == [u.__dict__ for u in expected]
+
+    # Stepping one at a time gives the same uposathas
+    u = kattika_uposatha(2024)
+    while u.next_uposatha().date.year < 2024:
+        u = u.next_uposatha()
+    for m in iter_uposathas(datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)):
+        u = u.next_uposatha()
+        assert u.__dict__ == m.__dict__
+
+def test_uposatha_at():
+    start = datetime.date(2023, 11, 27)
+    moons = [u for u, _ in zip(iter_uposathas(start), range(800))]
+
+    for k in list(range(0, 60)) + list(range(60, 800, 23)):
+        assert uposatha_at(start, k).__dict__ == moons[k].__dict__
+
+    assert advance(moons[5], 700).__dict__ == moons[705].__dict__
+    assert advance(moons[5], 0) is moons[5]
+
+def test_uposatha_point_queries():
+    moons = list(iter_uposathas(datetime.date(2020, 1, 1), datetime.date(2023, 12, 31)))
+    by_ordinal = {u.date.toordinal(): u for u in moons}
+
+    for i in range(1, len(moons) - 1):
+        u = moons[i]
+        assert is_uposatha(u.date)
+        assert uposatha_on(u.date).__dict__ == u.__dict__
+        assert next_uposatha_after(u.date).__dict__ == moons[i+1].__dict__
+        assert previous_uposatha_before(u.date).__dict__ == moons[i-1].__dict__
+
+        # The days in between, across the year boundaries too
+        for x in range(u.date.toordinal() + 1, moons[i+1].date.toordinal()):
+            date = datetime.date.fromordinal(x)
+            assert x not in by_ordinal
+            assert not is_uposatha(date)
+            assert uposatha_on(date) is None
+            assert next_uposatha_after(date).__dict__ == moons[i+1].__dict__
+            assert previous_uposatha_before(date).__dict__ == u.__dict__
+
+def test_uposatha_table():
+    start = datetime.date(1990, 1, 1)
+    end = datetime.date(2030, 12, 31)
+    moons = list(iter_uposathas(start, end))
+    table = uposatha_table(start, end)
+
+    def values(u: UposathaMoon):
+        return (u.date, u.phase, u.event, u.s_number, u.s_total, u.u_days, u.m_days,
+                u.lunar_month, u.lunar_season, u.lunar_year, u.has_adhikavara)
+
+    assert len(table) == len(moons)
+    assert [values(u) for u in table.moons()] == [values(u) for u in moons]
+    assert values(table[100]) == values(moons[100])
+    assert [values(u) for u in table[10:20].moons()] == [values(u) for u in moons[10:20]]
+
+    vesakha = table.filter_event("vesakha")
+    assert [values(u) for u in vesakha.moons()] == [values(u) for u in moons if u.event == "vesakha"]
+    assert len(vesakha) == end.year - start.year + 1
+
+    vassa = table.filter_season(3)
+    assert [values(u) for u in vassa.moons()] == [values(u) for u in moons if u.lunar_season == 3]
+
+def test_cal_day_index():
+    from_date = datetime.date(2019, 12, 20)
+    to_date = datetime.date(2021, 2, 3)
+    days = get_json_cal_days(from_date, to_date)
+
+    # Merged one by one into a list, as before
+    expected: List[JsonCalDay] = []
+    for year in range(from_date.year, to_date.year + 1):
+        for e in generate_solar_year(year):
+            if from_date <= e.date <= to_date:
+                merge_event_into_cal_days(expected, e)
+    expected.sort(key=lambda d: d.date)
+
+    def values(d: JsonCalDay):
+        return (d.date,
+                d.uposatha_moon and d.uposatha_moon.__dict__,
+                d.half_moon and d.half_moon.phase,
+                [e.summary for e in d.events])
+
+    assert [values(d) for d in days] == [values(d) for d in expected]
+
+    assert days[3].date == expected[3].date
+    assert [d.date for d in days[-3:]] == [d.date for d in expected[-3:]]
+    assert days.get(days[5].date) is days[5]
+    assert days.get(datetime.date(2020, 1, 3)) is None
+
+    in_march = days.range(datetime.date(2020, 3, 1), datetime.date(2020, 3, 31))
+    assert [d.date for d in in_march] == [d.date for d in expected if d.date.year == 2020 and d.date.month == 3]
+
+    # Each day has its own lists
+    vassa = days.get(datetime.date(2020, 7, 6))
+    assert vassa is not None
+    assert len(vassa.events) == 1
+    assert all(d.events is not vassa.events for d in days if d is not vassa)
+
+def test_cal_day_index_list_helpers():
+    from_date = datetime.date(2020, 1, 1)
+    to_date = datetime.date(2020, 12, 31)
+    days = get_json_cal_days(from_date, to_date)
+    as_list = list(days)
+
+    assert days == as_list
+    assert days != as_list[1:]
+
+    def values(cal_days: Sequence[JsonCalDay]):
+        return [(d.date,
+                 d.uposatha_moon and d.uposatha_moon.date,
+                 d.half_moon and d.half_moon.phase,
+                 [e.summary for e in d.events])
+                for d in cal_days]
+
+    # The list helpers take the days from get_json_cal_days() like a list
+    for date in [datetime.date(2020, 1, 2), datetime.date(2020, 7, 6), datetime.date(2020, 11, 1)]:
+        e = Event()
+        e.date = date
+        e.summary = "Local event"
+        assert merge_event_into_cal_days(days, e) is days
+        merge_event_into_cal_days(as_list, e)
+        as_list.sort(key=lambda d: d.date)
+        assert values(days) == values(as_list)
+
+    n = len(days)
+    uposathas = sum(1 for d in days if d.uposatha_moon is not None)
+    assert add_half_moon_days(days) is days
+    add_half_moon_days(as_list)
+    as_list.sort(key=lambda d: d.date)
+    assert len(days) == n + uposathas
+    assert values(days) == values(as_list)
+    assert days == list(days)
+
+    # Removing and replacing days by position keeps the date order
+    as_list = list(days)
+    del days[0]
+    del as_list[0]
+    assert days == as_list
+
+    day = JsonCalDay()
+    day.date = days[3].date
+    days[3] = day
+    as_list[3] = day
+    assert days == as_list
+    assert day in days.range(day.date, day.date)
+
+    # The order comes from the dates, positional changes are rejected
+    other = JsonCalDay()
+    other.date = datetime.date(2021, 1, 1)
+    with pytest.raises(ValueError):
+        days[3] = other
+    with pytest.raises(TypeError):
+        days.insert(0, other)
+    with pytest.raises(TypeError):
+        days.reverse()
+    with pytest.raises(TypeError):
+        days[0:2] = [other]
+    assert days == as_list
+
+def test_json_cal_days_window():
+    def values(d: JsonCalDay):
+        return (d.date,
+                d.uposatha_moon and d.uposatha_moon.__dict__,
+                d.half_moon and d.half_moon.phase,
+                [e.summary for e in d.events])
+
+    year = get_json_cal_days(datetime.date(2020, 1, 1), datetime.date(2021, 12, 31))
+
+    for from_date, to_date in [(datetime.date(2020, 7, 3), datetime.date(2020, 7, 9)),
+                               (datetime.date(2020, 12, 28), datetime.date(2021, 1, 12)),
+                               (datetime.date(2021, 10, 19), datetime.date(2021, 10, 19))]:
+        days = get_json_cal_days(from_date, to_date)
+        assert [values(d) for d in days] == [values(d) for d in year.range(from_date, to_date)]
+
+class LocalFestival(HasIcalEvent):
+    def __init__(self, date: datetime.date, name: str):
+        self.date = date
+        self.name = name
+
+# Festival names by date, added by the handler registered for LocalFestival
+local_festivals: Dict[datetime.date, List[str]] = {}
+
+@add_event_to_json_cal_day.register
+def _add_local_festival(event: LocalFestival, day: JsonCalDay) -> JsonCalDay:
+    day.date = event.date
+    local_festivals.setdefault(event.date, []).append(event.name)
+    return day
+
+def test_add_event_registry():
+    class Kathina(Event):
+        pass
+
+    local_festivals.clear()
+
+    days = CalDayIndex()
+    k = Kathina()
+    k.date = datetime.date(2024, 11, 3)
+    days.merge_event(k)
+    days.merge_event(LocalFestival(datetime.date(2024, 11, 3), "Loy Krathong"))
+
+    day = days.get(datetime.date(2024, 11, 3))
+    assert day is not None
+    assert day.events == [k]
+    assert local_festivals == {datetime.date(2024, 11, 3): ["Loy Krathong"]}
+
+    class Unknown(HasIcalEvent):
+        date = datetime.date(2024, 1, 1)
+
+    with pytest.raises(Exception, match="can't handle type"):
+        days.merge_event(Unknown())
+
+def test_day_records_json(tmp_path):
+    from_date = datetime.date(2019, 12, 20)
+    to_date = datetime.date(2021, 2, 3)
+    days = get_json_cal_days(from_date, to_date)
+    records = [d.to_dict() for d in days]
+
+    json_path = tmp_path / "days.json"
+    write_day_records_json(iter_json_cal_days(from_date, to_date), str(json_path))
+    with open(json_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    assert text == json.dumps(records)
+
+    jsonl_path = tmp_path / "days.jsonl"
+    write_day_records_jsonl(iter_json_cal_days(from_date, to_date), str(jsonl_path))
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == records
+
+    # Every uposatha has all the fields, also the ones with default values.
+    keys = set(UposathaMoon().to_dict().keys())
+    uposathas = [r['uposatha_moon'] for r in records if r['uposatha_moon'] is not None]
+    assert len(uposathas) > 0
+    assert all(set(u.keys()) == keys for u in uposathas)
+
+    vassa = [r for r in records if r['date'] == "2020-07-06"][0]
+    assert vassa['events'] == [{"date": "2020-07-06", "summary": "First day of Vassa", "description": "First day of Vassa"}]
+
+def test_iter_calendar_events():
+    for show in [False, True]:
+        expected = []
+        for year in range(2018, 2026):
+            expected.extend(year_moondays(year))
+            expected.extend(year_moondays_associated_events(year, None, show, show))
+        expected.sort(key=lambda x: x['date'])
+
+        events = list(iter_calendar_events(datetime.date(2018, 1, 1), datetime.date(2025, 12, 31),
+                                           MOON_PHASE_DAY_TEXT, None, show, show))
+        assert events == expected
@@ -1,8 +1,15 @@
 import csv
 from pathlib import Path
 from typing import Dict, List
-from splendidmoons.event_helpers import (CalendarEvent, CalendarAssocEvent, parse_annual_events_csv, year_moondays,
-                                         year_moondays_associated_events)
+import datetime
+import json
+import sqlite3
+import pytest
+from splendidmoons.calendar_year import YearType
+from splendidmoons.sqlite_export import query_events, write_events_sqlite
+from splendidmoons.event_helpers import (CalendarEvent, CalendarAssocEvent, annual_events_source, calendar_event_to_json,
+                                         collect_events, iter_events, parse_annual_events_csv, write_events_csv,
+                                         write_events_json, year_blocks, year_moondays, year_moondays_associated_events)
 
 TEST_ASSOC_EVENTS: Dict[str, List[CalendarAssocEvent]] = {
     "magha": [
@@ -104,3 +111,107 @@ def test_generating_year_events_csv():
         assert result == expected
 
         csv_path.unlink()
+
+def test_annual_events_source(tmp_path):
+    csv_path = tmp_path / "annual.csv"
+    header = "date,note,label,day_text,phase,season,season_number,season_total,days\n"
+
+    with open(csv_path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        f.write("1970-01-16,Memorial Day,memorial,,,,0,0,0\n")
+        f.write("2000-02-29,Leap Day,leap-day,,,,0,0,0\n")
+
+    source = annual_events_source(str(csv_path))
+    assert annual_events_source(str(csv_path)) is source
+
+    events = source.events([2023, 2024])
+    assert [(e['date'], e['label']) for e in events] == [
+        (datetime.date(2023, 1, 16), "memorial"),
+        (datetime.date(2024, 1, 16), "memorial"),
+        (datetime.date(2024, 2, 29), "leap-day"),
+    ]
+    assert parse_annual_events_csv(2024, str(csv_path)) == events[1:]
+
+    # Parsed again after the file changes
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write("1970-04-13,New Year,new-year,,,,0,0,0\n")
+
+    changed = annual_events_source(str(csv_path))
+    assert changed is not source
+    assert [e['label'] for e in changed.year_events(2023)] == ["memorial", "new-year"]
+
+def test_collect_events_jobs():
+    assert year_blocks(2000, 2009, 1) == [(2000, 2002), (2003, 2005), (2006, 2007), (2008, 2009)]
+
+    csv_path = "./tests/data/fs-calendar-annual-events.csv"
+    events = collect_events(2015, 2030, csv_path)
+    assert collect_events(2015, 2030, csv_path, jobs=3) == events
+
+def test_streaming_event_writers(tmp_path):
+    csv_path = "./tests/data/fs-calendar-annual-events.csv"
+
+    # Materialized and sorted, as the export commands used to do it
+    events: List[CalendarEvent] = []
+    for year in range(2019, 2024):
+        events.extend(year_moondays(year))
+        events.extend(year_moondays_associated_events(year))
+        events.extend(parse_annual_events_csv(year, csv_path))
+    events = sorted(events, key=lambda x: x['date'])
+
+    assert list(iter_events(2019, 2023, csv_path)) == events
+
+    expected_csv = tmp_path / "expected.csv"
+    with open(expected_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=events[0].keys(), delimiter=';')
+        writer.writeheader()
+        for row in events:
+            writer.writerow(row)
+
+    result_csv = tmp_path / "result.csv"
+    write_events_csv(iter_events(2019, 2023, csv_path), str(result_csv), ';')
+    assert result_csv.read_text(encoding='utf-8') == expected_csv.read_text(encoding='utf-8')
+
+    result_json = tmp_path / "result.json"
+    write_events_json(iter_events(2019, 2023, csv_path), str(result_json))
+    assert result_json.read_text(encoding='utf-8') == json.dumps([calendar_event_to_json(x) for x in events])
+
+def test_events_sqlite(tmp_path):
+    csv_path = "./tests/data/fs-calendar-annual-events.csv"
+    db_path = str(tmp_path / "events.db")
+
+    write_events_sqlite(db_path, 2019, 2023, csv_path)
+    # Writing again replaces the tables
+    write_events_sqlite(db_path, 2019, 2023, csv_path)
+
+    events = list(iter_events(2019, 2023, csv_path))
+    assert query_events(db_path) == events
+
+    from_date = datetime.date(2021, 3, 1)
+    to_date = datetime.date(2021, 8, 31)
+    assert query_events(db_path, from_date, to_date) == [e for e in events if from_date <= e['date'] <= to_date]
+    assert query_events(db_path, label="vesakha") == [e for e in events if e['label'] == "vesakha"]
+    assert query_events(db_path, phase="full", season="Vassāna") == \
+        [e for e in events if e['phase'] == "full" and e['season'] == "Vassāna"]
+
+    conn = sqlite3.connect(db_path)
+    years = conn.execute("SELECT year, year_type, year_length, asalha_puja FROM years ORDER BY year").fetchall()
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    labels = [r[0] for r in conn.execute("SELECT name FROM labels ORDER BY id")]
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    conn.close()
+
+    # Each label is stored once and referred to by id
+    assert sorted(labels) == sorted({e['label'] for e in events})
+
+    assert years[2] == (2021, int(YearType.Adhikamasa), 384, "2021-07-24")
+    assert {"events_date", "events_label", "events_phase", "events_season"} <= indexes
+
+    # A failed write raises its own error and keeps the earlier tables
+    with pytest.raises(FileNotFoundError):
+        write_events_sqlite(db_path, 2019, 2023, str(tmp_path / "missing.csv"))
+    assert query_events(db_path) == events
+
+    not_a_db = tmp_path / "not_a.db"
+    not_a_db.write_bytes(b"x" * 1024)
+    with pytest.raises(sqlite3.DatabaseError, match="not a database"):
+        write_events_sqlite(str(not_a_db), 2019, 2019)